@@ -0,0 +1,127 @@
+import os
+import json
+import gzip
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from llm_cache import make_cache_key
+from metrics import metrics
+
+# PROVIDER_CASSETTE_MODE: "off" (default), "record" or "replay"
+CASSETTE_MODE = os.environ.get("PROVIDER_CASSETTE_MODE", "off").lower()
+CASSETTE_DIR = os.environ.get("PROVIDER_CASSETTE_DIR", "cassettes")
+# Replay latency: "0" serves tapes immediately, "1" reproduces recorded latency, other values scale it
+CASSETTE_LATENCY_SCALE = float(os.environ.get("PROVIDER_CASSETTE_LATENCY", "0"))
+
+class CassetteMiss(KeyError):
+    pass
+
+class Cassette:
+    # Tape store of provider request/response pairs: one gzipped JSON file per request hash,
+    # plus an append-only index.jsonl describing every recording
+    def __init__(self, directory=CASSETTE_DIR, mode=CASSETTE_MODE, latency_scale=CASSETTE_LATENCY_SCALE):
+        self.directory = directory
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def tape_path(self, provider, key):
+        return os.path.join(self.directory, provider, key[:2], f"{key}.json.gz")
+
+    def save(self, provider, key, request, tape):
+        path = self.tape_path(provider, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = dict(tape, provider=provider, key=key, request=request,
+                     recorded_at=datetime.now(timezone.utc).isoformat())
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, path)
+        with self.lock, open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8") as index:
+            index.write(json.dumps({
+                "provider": provider,
+                "key": key,
+                "recorded_at": entry["recorded_at"],
+                "elapsed": tape.get("elapsed"),
+                "path": os.path.relpath(path, self.directory),
+            }) + "\n")
+        metrics.increment(f"cassette.{provider}.recorded")
+
+    def load(self, provider, key):
+        path = self.tape_path(provider, key)
+        if not os.path.exists(path):
+            metrics.increment(f"cassette.{provider}.misses")
+            raise CassetteMiss(f"No {provider} tape recorded for request {key}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+        metrics.increment(f"cassette.{provider}.replayed")
+        return entry
+
+    def simulate_latency(self, seconds):
+        if self.latency_scale > 0 and seconds:
+            time.sleep(seconds * self.latency_scale)
+
+    def call(self, provider, request, fn, encode=None, decode=None):
+        # Wraps a provider call: replays the tape for this request, or runs fn() and records it
+        key = make_cache_key(provider, request)
+        if self.replaying:
+            entry = self.load(provider, key)
+            self.simulate_latency(entry.get("elapsed"))
+            return decode(entry["response"]) if decode else entry["response"]
+
+        start = time.monotonic()
+        result = fn()
+        if self.recording:
+            elapsed = time.monotonic() - start
+            try:
+                self.save(provider, key, request, {"response": encode(result) if encode else result, "elapsed": elapsed})
+            except OSError as e:
+                logging.error(f"Error recording {provider} tape: {e}")
+        return result
+
+    def stream(self, provider, request, stream_fn):
+        # Like call() for streaming responses; chunks are recorded with their arrival offsets
+        key = make_cache_key(provider, request)
+        if self.replaying:
+            entry = self.load(provider, key)
+            previous = 0.0
+            for offset, chunk in entry["chunks"]:
+                self.simulate_latency(offset - previous)
+                previous = offset
+                yield chunk
+            return
+
+        start = time.monotonic()
+        chunks = []
+        failed = False
+        try:
+            for chunk in stream_fn():
+                if self.recording:
+                    chunks.append((time.monotonic() - start, chunk))
+                yield chunk
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # A consumer that stops early (e.g. once the JSON array closed) still leaves a usable tape
+            if self.recording and chunks and not failed:
+                try:
+                    self.save(provider, key, request, {"chunks": chunks, "elapsed": time.monotonic() - start})
+                except OSError as e:
+                    logging.error(f"Error recording {provider} tape: {e}")
+
+cassette = Cassette()
+
+if cassette.mode not in ("off", "record", "replay"):
+    raise ValueError(f"Invalid PROVIDER_CASSETTE_MODE: {cassette.mode}. Use off, record or replay.")
+if cassette.mode != "off":
+    logging.info(f"Provider cassette mode: {cassette.mode} ({cassette.directory})")
@@ -1,34 +1,169 @@
 import os
 from anthropic import Anthropic
+from anthropic.types import Message
 from tenacity import retry, stop_after_attempt, wait_exponential
 import json
 import logging
+from deadline import DeadlineExceeded, request_timeout, retry_unless_deadline
+from cassette import cassette
+from llm_cache import make_cache_key
+from hedging import hedged_call
+from metrics import metrics
+from singleflight import SingleFlight
+from prompts import get_prompt
 
 CLAUDE_API_KEY = os.environ.get("CLAUDE_API_KEY")
-if not CLAUDE_API_KEY:
+if not CLAUDE_API_KEY and not cassette.replaying:
     raise ValueError("CLAUDE_API_KEY environment variable is not set")
 
-anthropic = Anthropic(api_key=CLAUDE_API_KEY)
+CLAUDE_TIMEOUT_SECONDS = float(os.environ.get("CLAUDE_TIMEOUT_SECONDS", "120"))
+
+# Replayed sessions never reach the API, so they don't need a real key. Retries are left to
+# tenacity, which stops once the deadline has passed; SDK retries would not.
+anthropic = Anthropic(api_key=CLAUDE_API_KEY or "replay", timeout=CLAUDE_TIMEOUT_SECONDS, max_retries=0)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def generate_claude_response(prompt: str, max_tokens: int = 4000) -> str:
+CLAUDE_MODEL_TIERS = {
+    "fast": os.environ.get("CLAUDE_FAST_MODEL", "claude-3-haiku-20240307"),
+    "large": os.environ.get("CLAUDE_LARGE_MODEL", "claude-3-5-sonnet-20240620"),
+}
+
+# Task type -> model tier (or an explicit model id). Override with CLAUDE_MODEL_ROUTES='{"task": "tier"}'.
+CLAUDE_MODEL_ROUTES = {
+    "default": "large",
+    "sector_info": "fast",
+    "sector_questions": "fast",
+    "analyze_startup": "fast",
+    "deal_summary": "fast",
+    "tech_risk_assessment": "fast",
+    "gp_chunk_summary": "fast",
+    "gp_summary": "large",
+}
+CLAUDE_MODEL_ROUTES.update(json.loads(os.environ.get("CLAUDE_MODEL_ROUTES", "{}")))
+
+# Assessments from a non-large model are re-run on the large model at these confidence levels
+CLAUDE_ESCALATION_CONFIDENCE = [
+    level.strip().lower() for level in os.environ.get("CLAUDE_ESCALATION_CONFIDENCE", "Low,Unknown").split(",")
+]
+
+def resolve_model(task: str) -> str:
+    route = CLAUDE_MODEL_ROUTES.get(task, CLAUDE_MODEL_ROUTES["default"])
+    return CLAUDE_MODEL_TIERS.get(route, route)
+
+# Hedged duplicates go to this model when set, otherwise to the same model (see hedging.py).
+# Escalated assessments always hedge on the large model.
+CLAUDE_HEDGE_FALLBACK_MODEL = os.environ.get("CLAUDE_HEDGE_FALLBACK_MODEL")
+
+CLAUDE_ERROR_RESPONSE = "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
+
+def record_usage(usage):
+    for field in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+        metrics.increment(f"claude.{field}", getattr(usage, field, None) or 0)
+    logging.info(
+        f"Claude usage: input={usage.input_tokens} output={usage.output_tokens} "
+        f"cache_write={getattr(usage, 'cache_creation_input_tokens', None) or 0} "
+        f"cache_read={getattr(usage, 'cache_read_input_tokens', None) or 0}"
+    )
+
+def check_prompt_cache(request, usage):
+    # The provider silently skips caching prefixes below the model's minimum length
+    system = request.get("system")
+    if not isinstance(system, list) or not any(block.get("cache_control") for block in system):
+        return
+    if not (getattr(usage, "cache_creation_input_tokens", None) or getattr(usage, "cache_read_input_tokens", None)):
+        metrics.increment("claude.uncached_prefixes")
+        logging.warning(
+            f"Prompt prefix marked for caching was not cached by {request['model']} "
+            f"({usage.input_tokens} input tokens); it may be shorter than the model's minimum cacheable length"
+        )
+
+claude_single_flight = SingleFlight("claude")
+
+def create_claude_message(request):
+    response = cassette.call(
+        "claude",
+        request,
+        lambda: anthropic.messages.create(**request, timeout=request_timeout(CLAUDE_TIMEOUT_SECONDS)),
+        encode=lambda message: message.model_dump(mode="json"),
+        decode=Message.model_validate
+    )
+    metrics.increment("claude.requests")
+    record_usage(response.usage)
+    check_prompt_cache(request, response.usage)
+    return response
+
+def generate_claude_response(prompt: str, max_tokens: int = 4000, system=None, task: str = "default", model: str = None, hedge: bool = False, hedge_model: str = None) -> str:
+    model = model or resolve_model(task)
+    metrics.increment(f"claude.route.{task}.{model}")
     try:
-        response = anthropic.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=max_tokens,
-            messages=[
+        request = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [
                 {"role": "user", "content": prompt}
             ]
-        )
+        }
+        if system:
+            request["system"] = system
+        cache_key = make_cache_key("claude", request)
+        if hedge:
+            # The hedge bypasses single-flight so it is not coalesced into the slow in-flight call
+            hedge_request = dict(request, model=hedge_model or CLAUDE_HEDGE_FALLBACK_MODEL or model)
+            response = hedged_call(
+                f"claude.{task}.{model}",
+                lambda: claude_single_flight.do(cache_key, create_claude_message, request),
+                lambda: create_claude_message(hedge_request)
+            )
+        else:
+            response = claude_single_flight.do(cache_key, create_claude_message, request)
         return response.content[0].text
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logging.error(f"Error generating Claude response: {e}")
-        return "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def generate_claude_response_with_retry(prompt: str, max_tokens: int = 2000) -> str:
-    return generate_claude_response(prompt, max_tokens)
+        return CLAUDE_ERROR_RESPONSE
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), retry=retry_unless_deadline)
+def generate_claude_response_with_retry(prompt: str, max_tokens: int = 2000, system=None, task: str = "default", model: str = None, hedge: bool = False, hedge_model: str = None) -> str:
+    return generate_claude_response(prompt, max_tokens, system=system, task=task, model=model, hedge=hedge, hedge_model=hedge_model)
+
+def parse_tech_risk_response(response: str) -> dict:
+    lines = response.split('\n')
+    parsed_response = {}
+    current_category = ""
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith(('1.', '2.', '3.', '4.', '5.')):
+            parts = line.split(':', 1)
+            if len(parts) == 2:
+                current_category = parts[0].split('.')[1].strip()
+                risk_level = parts[1].strip()
+                parsed_response[current_category] = {"risk": risk_level}
+        elif line.startswith('Explanation:'):
+            if current_category:
+                parsed_response[current_category]["explanation"] = line.split(':', 1)[1].strip()
+        elif line.startswith('Overall Risk Score:'):
+            try:
+                parsed_response["Overall Risk Score"] = float(line.split(':')[1].strip())
+            except ValueError:
+                parsed_response["Overall Risk Score"] = "Unable to parse"
+        elif line.startswith('Summary:'):
+            parsed_response["Summary"] = line.split(':', 1)[1].strip()
+        elif line.startswith('Confidence:'):
+            parsed_response["Confidence"] = line.split(':')[1].strip()
+
+    return parsed_response
+
+def tech_risk_escalation_reason(response: str, parsed_response: dict):
+    if response == CLAUDE_ERROR_RESPONSE:
+        return "error"
+    if not isinstance(parsed_response.get("Overall Risk Score"), float):
+        return "unparsable"
+    if parsed_response.get("Confidence", "Unknown").strip("[]").lower() in CLAUDE_ESCALATION_CONFIDENCE:
+        return "low_confidence"
+    return None
 
 def assess_tech_risk(startup_info_json: str):
     try:
@@ -41,70 +176,31 @@ def assess_tech_risk(startup_info_json: str):
     startup_description = startup_info.get('description', 'No description available')
     startup_technology = startup_info.get('technology', 'No technology information available')
 
-    prompt = f'''
-Based on the following startup information, assess the technological risk:
-
-Startup Name: {startup_name}
-Description: {startup_description}
-Technology: {startup_technology}
-
-Provide your assessment in the following strict format:
-
-1. Technology Novelty: [Low/Medium/High]
-Explanation: [1 sentence explanation]
-
-2. Development Stage: [Early/Mid/Late]
-Explanation: [1 sentence explanation]
-
-3. Market Potential: [Low/Medium/High]
-Explanation: [1 sentence explanation]
-
-4. Competition: [Low/Medium/High]
-Explanation: [1 sentence explanation]
-
-5. Regulatory Risk: [Low/Medium/High]
-Explanation: [1 sentence explanation]
-
-Overall Risk Score: [1-10]
-
-Summary: [2-3 sentence summary of key risk factors]
-
-Confidence: [Low/Medium/High]
-
-Note: If information is not available for any category, use "Unknown" for the risk level and "Insufficient information" for the explanation.
-'''
+    system, prompt = get_prompt("tech_risk_assessment").render(
+        name=startup_name,
+        description=startup_description,
+        technology=startup_technology
+    )
+    model = resolve_model("tech_risk_assessment")
     try:
-        response = generate_claude_response_with_retry(prompt)
+        response = generate_claude_response_with_retry(prompt, system=system, task="tech_risk_assessment", model=model, hedge=True)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logging.error(f"Error generating risk assessment for {startup_name}: {e}")
         return f"Error: Unable to generate risk assessment for {startup_name}. Please try again later."
 
     try:
-        # Parse the response
-        lines = response.split('\n')
-        parsed_response = {}
-        current_category = ""
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith(('1.', '2.', '3.', '4.', '5.')):
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    current_category = parts[0].split('.')[1].strip()
-                    risk_level = parts[1].strip()
-                    parsed_response[current_category] = {"risk": risk_level}
-            elif line.startswith('Explanation:'):
-                if current_category:
-                    parsed_response[current_category]["explanation"] = line.split(':', 1)[1].strip()
-            elif line.startswith('Overall Risk Score:'):
-                try:
-                    parsed_response["Overall Risk Score"] = float(line.split(':')[1].strip())
-                except ValueError:
-                    parsed_response["Overall Risk Score"] = "Unable to parse"
-            elif line.startswith('Summary:'):
-                parsed_response["Summary"] = line.split(':', 1)[1].strip()
-            elif line.startswith('Confidence:'):
-                parsed_response["Confidence"] = line.split(':')[1].strip()
+        parsed_response = parse_tech_risk_response(response)
+
+        large_model = CLAUDE_MODEL_TIERS["large"]
+        escalation_reason = tech_risk_escalation_reason(response, parsed_response) if model != large_model else None
+        if escalation_reason:
+            logging.info(f"Escalating risk assessment for {startup_name} from {model} to {large_model}: {escalation_reason}")
+            metrics.increment(f"claude.escalations.tech_risk_assessment.{escalation_reason}")
+            # Hedge on the large model too: a fallback-model answer would undo the escalation
+            response = generate_claude_response_with_retry(prompt, system=system, task="tech_risk_assessment", model=large_model, hedge=True, hedge_model=large_model)
+            parsed_response = parse_tech_risk_response(response)
 
         # Construct the formatted response
         formatted_response = f"Technology Risk Assessment for {startup_name}:\n\n"
@@ -122,6 +218,8 @@ Note: If information is not available for any category, use "Unknown" for the ri
 
         return formatted_response
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logging.error(f"Error parsing risk assessment response for {startup_name}: {e}")
         return f"Error: Unable to generate a valid risk assessment for {startup_name}. Please check the API response format."
@@ -137,7 +235,7 @@ def generate_sector_info(sector: str) -> dict:
     4. [Sub-sector name]: [Brief description]
     5. [Sub-sector name]: [Brief description]
     '''
-    response = generate_claude_response(prompt)
+    response = generate_claude_response(prompt, task="sector_info")
     
     # Parse the response
     parts = response.split('Sub-sectors:')
@@ -161,11 +259,11 @@ def generate_sector_info(sector: str) -> dict:
 
 def generate_sector_questions():
     prompt = "Generate 3 questions to help a GP identify promising deeptech sectors for investment."
-    return generate_claude_response(prompt)
+    return generate_claude_response(prompt, task="sector_questions")
 
 def analyze_startup(startup_info):
     prompt = f"Analyze the following startup and provide a brief summary of its potential and risks:\n\n{startup_info}"
-    return generate_claude_response(prompt)
+    return generate_claude_response(prompt, task="analyze_startup")
 
 def generate_deal_summary(startup_info, risk_assessment):
     prompt = f"""
@@ -179,4 +277,4 @@ Risk Assessment:
 
 Provide a summary in 3-4 sentences, highlighting key points for a GP to consider.
 """
-    return generate_claude_response(prompt)
+    return generate_claude_response(prompt, task="deal_summary")
@@ -2,17 +2,7 @@ import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from tenacity import retry, stop_after_attempt, wait_exponential
-
-def drop_tables(conn):
-    queries = [
-        "DROP TABLE IF EXISTS startup_assessments",
-        "DROP TABLE IF EXISTS startups",
-        "DROP TABLE IF EXISTS sectors"
-    ]
-    with conn.cursor() as cur:
-        for query in queries:
-            cur.execute(query)
-    conn.commit()
+from deadline import DeadlineExceeded, get_deadline
 
 def create_tables(conn):
     queries = [
@@ -37,10 +27,18 @@ def create_tables(conn):
         CREATE TABLE IF NOT EXISTS startup_assessments (
             id SERIAL PRIMARY KEY,
             startup_id INTEGER REFERENCES startups(id) UNIQUE,
-            risk_score INTEGER,
+            risk_score REAL,
             comments TEXT
         )
-        '''
+        ''',
+        "ALTER TABLE startup_assessments ALTER COLUMN risk_score TYPE REAL",
+        "ALTER TABLE startup_assessments ADD COLUMN IF NOT EXISTS technology_novelty VARCHAR(16)",
+        "ALTER TABLE startup_assessments ADD COLUMN IF NOT EXISTS development_stage VARCHAR(16)",
+        "ALTER TABLE startup_assessments ADD COLUMN IF NOT EXISTS market_potential VARCHAR(16)",
+        "ALTER TABLE startup_assessments ADD COLUMN IF NOT EXISTS competition VARCHAR(16)",
+        "ALTER TABLE startup_assessments ADD COLUMN IF NOT EXISTS regulatory_risk VARCHAR(16)",
+        "ALTER TABLE startup_assessments ADD COLUMN IF NOT EXISTS confidence VARCHAR(16)",
+        "CREATE INDEX IF NOT EXISTS startups_sector_sub_sector_idx ON startups (sector_id, sub_sector)"
     ]
     
     with conn.cursor() as cur:
@@ -94,18 +92,21 @@ def populate_startups(conn):
     conn.commit()
     print("Startups population completed")  # Debug log
 
+def get_connection():
+    return psycopg2.connect(
+        host=os.environ["PGHOST"],
+        database=os.environ["PGDATABASE"],
+        user=os.environ["PGUSER"],
+        password=os.environ["PGPASSWORD"],
+        port=os.environ["PGPORT"],
+        cursor_factory=RealDictCursor
+    )
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 def init_connection():
     try:
-        conn = psycopg2.connect(
-            host=os.environ["PGHOST"],
-            database=os.environ["PGDATABASE"],
-            user=os.environ["PGUSER"],
-            password=os.environ["PGPASSWORD"],
-            port=os.environ["PGPORT"],
-            cursor_factory=RealDictCursor
-        )
-        drop_tables(conn)
+        conn = get_connection()
+        # Tables are kept across restarts so stored assessments accumulate into a portfolio
         create_tables(conn)
         populate_sectors(conn)
         populate_startups(conn)
@@ -114,12 +115,29 @@ def init_connection():
         print(f"Error connecting to the database: {e}")
         raise
 
+def set_statement_timeout(cur):
+    # Bound the statement by the caller's deadline; SET LOCAL only lasts for the current transaction
+    deadline = get_deadline()
+    if deadline is not None:
+        deadline.check()
+        cur.execute("SET LOCAL statement_timeout = %s", (max(1, int(deadline.remaining() * 1000)),))
+
 def execute_query(conn, query, params=None):
     with conn.cursor() as cur:
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
+        try:
+            set_statement_timeout(cur)
+            if params:
+                cur.execute(query, params)
+            else:
+                cur.execute(query)
+        except psycopg2.extensions.QueryCanceledError as e:
+            conn.rollback()
+            raise DeadlineExceeded(f"Database query cancelled: {e}")
+        except psycopg2.Error:
+            # The session keeps this connection across reruns; without a rollback every later
+            # query would fail with "current transaction is aborted"
+            conn.rollback()
+            raise
         try:
             return cur.fetchall()
         except psycopg2.ProgrammingError:
@@ -137,14 +155,59 @@ def get_startups_by_sector(conn, sector, sub_sector):
     """
     return execute_query(conn, query, (sector, sub_sector))
 
-def save_startup_assessment(conn, startup_id, risk_score, comments):
+def parse_funding(funding):
+    # Perplexity reports funding as free text such as "$12.5M" or "Undisclosed"
+    if funding is None:
+        return None
+    if isinstance(funding, (int, float)):
+        return funding
+    text = str(funding).strip().upper().replace("$", "").replace(",", "")
+    multipliers = {"K": 1e3, "M": 1e6, "B": 1e9}
+    multiplier = 1
+    if text and text[-1] in multipliers:
+        multiplier = multipliers[text[-1]]
+        text = text[:-1]
+    try:
+        return float(text) * multiplier
+    except ValueError:
+        return None
+
+RISK_DIMENSION_COLUMNS = [
+    "technology_novelty", "development_stage", "market_potential",
+    "competition", "regulatory_risk", "confidence"
+]
+
+def save_startup(conn, startup, sector, sub_sector):
     query = """
-    INSERT INTO startup_assessments (startup_id, risk_score, comments)
-    VALUES (%s, %s, %s)
+    INSERT INTO startups (name, description, sector_id, sub_sector, funding, technology)
+    VALUES (%s, %s, (SELECT id FROM sectors WHERE name = %s), %s, %s, %s)
+    ON CONFLICT (name) DO UPDATE
+    SET description = EXCLUDED.description, sector_id = EXCLUDED.sector_id,
+        sub_sector = EXCLUDED.sub_sector, funding = EXCLUDED.funding, technology = EXCLUDED.technology
+    RETURNING id
+    """
+    result = execute_query(conn, query, (
+        startup['name'],
+        startup.get('description'),
+        sector,
+        sub_sector,
+        parse_funding(startup.get('funding')),
+        startup.get('technology')
+    ))
+    conn.commit()
+    return result[0]['id']
+
+def save_startup_assessment(conn, startup_id, risk_score, comments, dimensions=None):
+    dimensions = dimensions or {}
+    query = f"""
+    INSERT INTO startup_assessments (startup_id, risk_score, comments, {", ".join(RISK_DIMENSION_COLUMNS)})
+    VALUES (%s, %s, %s, {", ".join(["%s"] * len(RISK_DIMENSION_COLUMNS))})
     ON CONFLICT (startup_id) DO UPDATE
-    SET risk_score = EXCLUDED.risk_score, comments = EXCLUDED.comments
+    SET risk_score = EXCLUDED.risk_score, comments = EXCLUDED.comments,
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in RISK_DIMENSION_COLUMNS)}
     """
-    execute_query(conn, query, (startup_id, risk_score, comments))
+    params = (startup_id, risk_score, comments) + tuple(dimensions.get(column) for column in RISK_DIMENSION_COLUMNS)
+    execute_query(conn, query, params)
     conn.commit()
 
 def get_curated_startups(conn):
@@ -156,3 +219,46 @@ def get_curated_startups(conn):
     LIMIT 10
     """
     return execute_query(conn, query)
+
+def iter_startup_assessments(conn, batch_size=5000):
+    # Named (server-side) cursor so large exports are fetched in bounded batches
+    query = """
+    SELECT s.id, s.name, s.description, sec.name AS sector, s.sub_sector,
+           s.funding, s.technology, sa.risk_score, sa.comments,
+           sa.technology_novelty, sa.development_stage, sa.market_potential,
+           sa.competition, sa.regulatory_risk, sa.confidence
+    FROM startups s
+    LEFT JOIN sectors sec ON s.sector_id = sec.id
+    JOIN startup_assessments sa ON s.id = sa.startup_id
+    ORDER BY s.id
+    """
+    with conn.cursor(name="startup_assessments_export") as cur:
+        cur.itersize = batch_size
+        cur.execute(query)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+def get_portfolio_assessments(conn):
+    query = """
+    SELECT s.id, sec.name AS sector, s.sub_sector, sa.risk_score,
+           sa.technology_novelty, sa.development_stage, sa.market_potential,
+           sa.competition, sa.regulatory_risk, sa.confidence
+    FROM startups s
+    LEFT JOIN sectors sec ON s.sector_id = sec.id
+    JOIN startup_assessments sa ON s.id = sa.startup_id
+    """
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        try:
+            set_statement_timeout(cur)
+            cur.execute(query)
+        except psycopg2.extensions.QueryCanceledError as e:
+            conn.rollback()
+            raise DeadlineExceeded(f"Database query cancelled: {e}")
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        columns = [column.name for column in cur.description]
+        return columns, cur.fetchall()
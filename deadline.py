@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from tenacity import retry_if_not_exception_type
+
+# Budget for everything triggered by one user action (one Streamlit script run)
+ACTION_DEADLINE_SECONDS = float(os.environ.get("ACTION_DEADLINE_SECONDS", "300"))
+# How often blocked waits on worker threads re-check for cancellation
+DEADLINE_POLL_SECONDS = 0.25
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Deadline:
+    def __init__(self, timeout, name="action", parent=None, cancel_if=None):
+        self.name = name
+        self.parent = parent
+        # Optional callable polled by is_cancelled, for cancellation signalled from outside
+        self.cancel_if = cancel_if
+        self.expires_at = time.monotonic() + timeout
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self):
+        if self.cancelled.is_set():
+            return True
+        if self.cancel_if is not None and self.cancel_if():
+            self.cancelled.set()
+            return True
+        return self.parent is not None and self.parent.is_cancelled()
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.is_cancelled() or self.remaining() <= 0
+
+    def check(self):
+        if self.is_cancelled():
+            raise DeadlineExceeded(f"Deadline '{self.name}' was cancelled")
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"Deadline '{self.name}' exceeded")
+
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+def get_deadline():
+    return current_deadline.get()
+
+@contextmanager
+def deadline_scope(timeout=None, name="action", deadline=None):
+    # Binds a deadline to the current context; without an explicit deadline a child of the
+    # current one is created, so nested scopes can only shorten the remaining budget
+    if deadline is None:
+        deadline = Deadline(timeout, name=name, parent=get_deadline())
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
+
+def check_deadline():
+    deadline = get_deadline()
+    if deadline is not None:
+        deadline.check()
+
+def request_timeout(default=None):
+    # Per-request timeout bounded by the remaining deadline budget
+    deadline = get_deadline()
+    if deadline is None:
+        return default
+    deadline.check()
+    return deadline.remaining() if default is None else min(default, deadline.remaining())
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    # Worker threads don't inherit context variables; carry the caller's deadline along
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def wait_future(future):
+    # Waits for a worker-thread result while honouring cancellation of the current deadline
+    deadline = get_deadline()
+    if deadline is None:
+        return future.result()
+    while True:
+        deadline.check()
+        try:
+            return future.result(timeout=min(DEADLINE_POLL_SECONDS, deadline.remaining()))
+        except FuturesTimeoutError:
+            continue
+
+# Use with tenacity so expired or cancelled calls are not retried
+retry_unless_deadline = retry_if_not_exception_type(DeadlineExceeded)
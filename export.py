@@ -0,0 +1,93 @@
+import argparse
+import logging
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from database import get_connection, iter_startup_assessments
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+EXPORT_FORMATS = ("parquet", "arrow")
+
+EXPORT_SCHEMA = pa.schema([
+    ("id", pa.int32()),
+    ("name", pa.string()),
+    ("description", pa.string()),
+    ("sector", pa.string()),
+    ("sub_sector", pa.string()),
+    ("funding", pa.float64()),
+    ("technology", pa.string()),
+    ("risk_score", pa.float32()),
+    ("comments", pa.string()),
+    ("technology_novelty", pa.string()),
+    ("development_stage", pa.string()),
+    ("market_potential", pa.string()),
+    ("competition", pa.string()),
+    ("regulatory_risk", pa.string()),
+    ("confidence", pa.string()),
+])
+
+def rows_to_record_batch(rows, schema=EXPORT_SCHEMA):
+    columns = {field.name: [] for field in schema}
+    for row in rows:
+        for name in columns:
+            value = row.get(name)
+            # psycopg2 returns DECIMAL columns as Decimal
+            if name == "funding" and value is not None:
+                value = float(value)
+            columns[name].append(value)
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+def export_assessments(conn, path, export_format="parquet", batch_size=5000):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}. Use one of {EXPORT_FORMATS}.")
+
+    logging.info(f"Exporting startup assessments to {path} ({export_format})")
+
+    sink = None
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(path, EXPORT_SCHEMA)
+    else:
+        sink = pa.OSFile(path, "wb")
+        writer = ipc.new_file(sink, EXPORT_SCHEMA)
+
+    total_rows = 0
+    try:
+        for rows in iter_startup_assessments(conn, batch_size):
+            batch = rows_to_record_batch(rows)
+            writer.write_batch(batch)
+            total_rows += batch.num_rows
+    finally:
+        writer.close()
+        if sink is not None:
+            sink.close()
+
+    logging.info(f"Exported {total_rows} startup assessments to {path}")
+    return total_rows
+
+def infer_export_format(path):
+    return "arrow" if path.endswith((".arrow", ".feather")) else "parquet"
+
+def read_export(path, export_format=None, memory_map=True):
+    if (export_format or infer_export_format(path)) == "parquet":
+        return pq.read_table(path, memory_map=memory_map)
+    source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+    return ipc.open_file(source).read_all()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export startups and their assessments for offline analysis.")
+    parser.add_argument("path", help="Output file (.parquet or .arrow)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="Export format (defaults to the output file extension)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    export_format = args.format or infer_export_format(args.path)
+    conn = get_connection()
+    try:
+        export_assessments(conn, args.path, export_format, args.batch_size)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
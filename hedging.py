@@ -0,0 +1,142 @@
+import os
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from deadline import Deadline, check_deadline, deadline_scope, get_deadline, submit_with_context, wait_future, DEADLINE_POLL_SECONDS
+from metrics import metrics
+
+# Opt-in: LLM_HEDGING=true issues a duplicate request when a call outlives its observed p95 latency
+HEDGING_ENABLED = os.environ.get("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+HEDGE_BUDGET_PERCENT = float(os.environ.get("LLM_HEDGE_BUDGET_PERCENT", "5"))
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_LATENCY_WINDOW = 500
+# Bounds concurrent hedge legs only; primaries run on their own threads
+HEDGE_MAX_WORKERS = int(os.environ.get("LLM_HEDGE_MAX_WORKERS", "32"))
+
+class LatencyTracker:
+    def __init__(self, window=HEDGE_LATENCY_WINDOW):
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self.lock:
+            self.samples[key].append(seconds)
+
+    def percentile(self, key, percentile=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES):
+        with self.lock:
+            samples = sorted(self.samples[key])
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, round(percentile / 100 * (len(samples) - 1)))]
+
+class HedgeBudget:
+    # Caps hedges at a percentage of all hedgeable calls
+    def __init__(self, percent=HEDGE_BUDGET_PERCENT):
+        self.percent = percent
+        self.calls = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def record_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def try_acquire(self):
+        with self.lock:
+            if (self.hedges + 1) * 100 > self.calls * self.percent:
+                return False
+            self.hedges += 1
+            return True
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+
+def bounded_timeout(timeout):
+    # Waits on the legs never outlast the caller's own deadline
+    deadline = get_deadline()
+    return timeout if deadline is None else min(timeout, deadline.remaining())
+
+def run_leg(fn, deadline):
+    with deadline_scope(deadline=deadline):
+        return fn()
+
+def start_primary(key, fn, deadline):
+    # The primary gets its own thread rather than a hedge_executor slot, so hedging never queues
+    # or caps ordinary calls and queueing never inflates the latency the p95 is measured from
+    future = Future()
+    context = contextvars.copy_context()
+    start = time.monotonic()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = context.run(run_leg, fn, deadline)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            # Only primaries are sampled: a hedge may run on another model with other latencies
+            latency_tracker.record(key, time.monotonic() - start)
+            future.set_result(result)
+
+    threading.Thread(target=target, name="hedge-primary", daemon=True).start()
+    return future
+
+def hedged_call(key, primary, hedge=None):
+    # Runs primary(); if it hasn't returned by the p95 latency observed for key and the hedge budget
+    # allows, also runs hedge() (defaults to primary) and returns whichever succeeds first.
+    # Each leg runs under its own child deadline, which is cancelled as soon as the other leg wins.
+    if not HEDGING_ENABLED:
+        return primary()
+
+    hedge_budget.record_call()
+    delay = latency_tracker.percentile(key)
+    if delay is None:
+        # Not enough samples to know when to hedge yet; just run and time the call
+        start = time.monotonic()
+        result = primary()
+        latency_tracker.record(key, time.monotonic() - start)
+        return result
+
+    legs = {}
+    first_deadline = Deadline(math.inf, name=f"{key} primary", parent=get_deadline())
+    first = start_primary(key, primary, first_deadline)
+    legs[first] = first_deadline
+    try:
+        if wait([first], timeout=bounded_timeout(delay)).done:
+            return wait_future(first)
+        check_deadline()
+
+        if not hedge_budget.try_acquire():
+            metrics.increment(f"hedge.{key}.budget_exhausted")
+            return wait_future(first)
+
+        logging.info(f"Hedging {key} after {delay:.2f}s")
+        metrics.increment(f"hedge.{key}.issued")
+        second_deadline = Deadline(math.inf, name=f"{key} hedge", parent=get_deadline())
+        second = submit_with_context(hedge_executor, run_leg, hedge or primary, second_deadline)
+        legs[second] = second_deadline
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=bounded_timeout(DEADLINE_POLL_SECONDS), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        metrics.increment(f"hedge.{key}.won")
+                    return future.result()
+                error = error or future.exception()
+            check_deadline()
+        raise error
+    finally:
+        # The losing leg stops at its next deadline check (retries, single-flight waits, stream chunks)
+        for future, deadline in legs.items():
+            if not future.done():
+                future.cancel()
+                deadline.cancel()
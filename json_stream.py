@@ -0,0 +1,73 @@
+import json
+import logging
+
+class JsonArrayObjectParser:
+    # Incrementally parses a JSON array of objects embedded in free text (e.g. an LLM completion).
+    # feed() returns each top-level object as soon as its closing brace arrives; a malformed
+    # object is skipped without discarding the objects parsed before or after it.
+    def __init__(self):
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.buffer = []
+        self.errors = 0
+
+    def feed(self, chunk: str) -> list:
+        objects = []
+        for char in chunk:
+            if self.finished:
+                break
+            if not self.in_array:
+                if char == "[":
+                    self.in_array = True
+                continue
+
+            if self.depth == 0:
+                if char == "{":
+                    self.depth = 1
+                    self.buffer = [char]
+                elif char == "]":
+                    self.finished = True
+                elif not (char.isspace() or char == ","):
+                    # Not an array of objects (e.g. a "[1]" citation in prose); wait for the next "["
+                    self.in_array = False
+                continue
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    parsed = self.parse_buffer()
+                    if parsed is not None:
+                        objects.append(parsed)
+        return objects
+
+    def parse_buffer(self):
+        text = "".join(self.buffer)
+        self.buffer = []
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            logging.warning(f"Skipping malformed JSON object in array: {e}")
+            return None
+        if not isinstance(parsed, dict):
+            self.errors += 1
+            return None
+        return parsed
+
+def parse_json_array_objects(content: str) -> list:
+    return JsonArrayObjectParser().feed(content)
@@ -1,53 +1,85 @@
 import streamlit as st
 from stages import sector_selector, startup_finder, tech_risk_assessor
-from database import init_connection
-from utils import initialize_session_state
+from database import init_connection, get_connection
+from utils import initialize_session_state, script_stop_check
+from metrics import metrics
+from deadline import Deadline, DeadlineExceeded, deadline_scope, ACTION_DEADLINE_SECONDS
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
+STAGES = ["Sector Selector", "Startup Finder", "Tech Risk Assessor"]
+
+@st.cache_resource(show_spinner=False)
+def initialize_database():
+    # Schema creation and seeding run once per server process instead of on every rerun
+    init_connection().close()
+    logging.info("Database initialized")
+    return True
+
+def get_session_connection():
+    initialize_database()
+    conn = st.session_state.get('db_connection')
+    if conn is None or conn.closed:
+        conn = get_connection()
+        st.session_state.db_connection = conn
+        logging.info("Database connection initialized")
+    return conn
+
 def main():
     try:
         st.set_page_config(page_title="DeepScout", layout="wide")
         st.title("DeepScout")
 
         # Initialize database connection
-        conn = init_connection()
-        logging.info("Database connection initialized")
+        conn = get_session_connection()
 
         # Initialize session state
         initialize_session_state()
         logging.info("Session state initialized")
 
+        # Apply a stage transition requested by the previous run before the radio is rendered
+        if st.session_state.get('transition_to_next_stage'):
+            st.session_state.current_stage = st.session_state.get('next_stage')
+            st.session_state.stage_select = st.session_state.current_stage
+            del st.session_state['transition_to_next_stage']
+            del st.session_state['next_stage']
+
         # Sidebar for navigation
         st.sidebar.title("Navigation")
-        stage = st.sidebar.radio("Select Stage", ["Sector Selector", "Startup Finder", "Tech Risk Assessor"])
+        stage = st.sidebar.radio("Select Stage", STAGES, key="stage_select")
 
         # Main content area
         logging.info(f"Current stage: {stage}")
+        # One deadline per script run. It is cancelled when the run ends, and as soon as Streamlit
+        # has a stop or rerun pending because the user interacted again or left, so worker threads
+        # and provider calls started by this run stop instead of producing results nobody will see.
+        deadline = Deadline(ACTION_DEADLINE_SECONDS, name=stage, cancel_if=script_stop_check())
         try:
-            if stage == "Sector Selector":
-                sector_selector.run(conn)
-            elif stage == "Startup Finder":
-                startup_finder.run(conn)
-            elif stage == "Tech Risk Assessor":
-                tech_risk_assessor.run()
-
-            # Check if we need to transition to the next stage
-            if st.session_state.get('transition_to_next_stage'):
-                st.session_state.current_stage = st.session_state.get('next_stage')
-                del st.session_state['transition_to_next_stage']
-                del st.session_state['next_stage']
-                st.rerun()
+            with deadline_scope(deadline=deadline):
+                if stage == "Sector Selector":
+                    sector_selector.run(conn)
+                elif stage == "Startup Finder":
+                    startup_finder.run(conn)
+                elif stage == "Tech Risk Assessor":
+                    tech_risk_assessor.run(conn)
 
+        except DeadlineExceeded as deadline_error:
+            logging.warning(f"{stage} stage stopped: {str(deadline_error)}")
+            st.warning("This step took too long and was stopped. Please try again.")
         except Exception as stage_error:
             logging.error(f"Error in {stage} stage: {str(stage_error)}")
             st.error(f"An error occurred in the {stage} stage. Please try again or contact support.")
+        finally:
+            deadline.cancel()
 
         # Display current stage and progress
         st.sidebar.write(f"Current Stage: {st.session_state.current_stage}")
         st.sidebar.progress(st.session_state.progress)
 
+        with st.sidebar.expander("LLM Metrics"):
+            st.json(metrics.snapshot())
+
         logging.info(f"Session state after stage execution: {st.session_state}")
     except Exception as e:
         logging.error(f"An error occurred in the main function: {str(e)}")
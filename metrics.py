@@ -0,0 +1,22 @@
+import threading
+from collections import defaultdict
+
+class Metrics:
+    # Process-wide counters shared by every Streamlit session
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+metrics = Metrics()
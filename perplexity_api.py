@@ -1,50 +1,84 @@
 import os
+import math
 import requests
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tenacity import retry, stop_after_attempt, wait_exponential
+from deadline import Deadline, DeadlineExceeded, check_deadline, deadline_scope, get_deadline, request_timeout, retry_unless_deadline, submit_with_context, DEADLINE_POLL_SECONDS
+from cassette import cassette
+from llm_cache import make_cache_key
+from metrics import metrics
+from singleflight import SingleFlight
+from hedging import hedged_call
+from json_stream import JsonArrayObjectParser, parse_json_array_objects
 
 PERPLEXITY_API_KEY = os.environ.get("PERPLEXITY_API_KEY")
 PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+PERPLEXITY_TIMEOUT_SECONDS = float(os.environ.get("PERPLEXITY_TIMEOUT_SECONDS", "120"))
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def check_perplexity_api_key():
-    return bool(PERPLEXITY_API_KEY)
+perplexity_single_flight = SingleFlight("perplexity")
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def generate_startup_list(sector: str, sub_sector: str, num_startups: int = 5) -> list:
-    if not check_perplexity_api_key():
-        raise ValueError("Perplexity API key is not set in the environment variables.")
+def post_completion(payload, headers):
+    response = requests.post(PERPLEXITY_API_URL, json=payload, headers=headers, timeout=request_timeout(PERPLEXITY_TIMEOUT_SECONDS))
+    response.raise_for_status()
+    metrics.increment("perplexity.requests")
+    return response.json()["choices"][0]["message"]["content"]
+
+def fetch_completion(payload, headers):
+    return cassette.call("perplexity", payload, lambda: post_completion(payload, headers))
 
-    logging.info(f"Generating startup list for {sector} - {sub_sector} using Perplexity API")
+def post_completion_stream(payload, headers):
+    timeout = request_timeout(PERPLEXITY_TIMEOUT_SECONDS)
+    with requests.post(PERPLEXITY_API_URL, json=payload, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        metrics.increment("perplexity.requests")
+        yield from iter_stream_content(response)
+
+def check_perplexity_api_key():
+    return bool(PERPLEXITY_API_KEY) or cassette.replaying
 
+def build_startup_list_request(sector: str, sub_sector: str, num_startups: int = 5, angle: str = None, stream: bool = False):
     headers = {
         "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
         "Content-Type": "application/json"
     }
 
-    prompt = f"""Search for {num_startups} startups in the {sector} sector focusing on lesser-known companies that are gaining traction, specifically in the {sub_sector} sub-sector. For each startup, provide the following information: name, description, funding amount (if available), and key technology. Format the response as a JSON array of startup objects, each containing 'name', 'description', 'funding', and 'technology' fields."""
+    prompt = f"""Search for {num_startups} startups in the {sector} sector focusing on lesser-known companies that are gaining traction, specifically in the {sub_sector} sub-sector.{f" Focus on {angle}." if angle else ""} For each startup, provide the following information: name, description, funding amount (if available), and key technology. Format the response as a JSON array of startup objects, each containing 'name', 'description', 'funding', and 'technology' fields."""
 
     payload = {
         "model": "llama-3.1-sonar-huge-128k-online",
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": 4000
     }
+    if stream:
+        payload["stream"] = True
+    return payload, headers
 
-    try:
-        response = requests.post(PERPLEXITY_API_URL, json=payload, headers=headers)
-        response.raise_for_status()
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), retry=retry_unless_deadline)
+def generate_startup_list(sector: str, sub_sector: str, num_startups: int = 5, angle: str = None) -> list:
+    if not check_perplexity_api_key():
+        raise ValueError("Perplexity API key is not set in the environment variables.")
 
-        content = response.json()["choices"][0]["message"]["content"]
-        logging.info(f"Raw API response:\n{content}")
+    logging.info(f"Generating startup list for {sector} - {sub_sector}{f' ({angle})' if angle else ''} using Perplexity API")
+
+    payload, headers = build_startup_list_request(sector, sub_sector, num_startups, angle)
 
-        # Extract the JSON array from the response
-        json_content = extract_json_array(content)
-        startup_list = json.loads(json_content)
+    try:
+        cache_key = make_cache_key("perplexity", payload)
+        content = hedged_call(
+            "perplexity.startup_list",
+            lambda: perplexity_single_flight.do(cache_key, fetch_completion, payload, headers),
+            lambda: fetch_completion(payload, headers)
+        )
+        logging.info(f"Raw API response:\n{content}")
 
-        if not isinstance(startup_list, list) or not all(isinstance(item, dict) for item in startup_list):
-            raise ValueError("Invalid response format: Not a list of dictionaries")
+        # Keep every well-formed startup object even if others in the array are malformed
+        startup_list = parse_json_array_objects(content)
+        if not startup_list:
+            raise ValueError("Invalid response format: JSON array of startup objects not found")
 
         logging.info(f"Parsed startup list: {startup_list}")
         return startup_list
@@ -52,17 +86,108 @@ def generate_startup_list(sector: str, sub_sector: str, num_startups: int = 5) -
     except requests.exceptions.RequestException as e:
         logging.error(f"Error calling Perplexity API: {e}")
         raise
-    except json.JSONDecodeError as e:
-        logging.error(f"Error decoding JSON response: {e}")
-        raise
     except Exception as e:
         logging.error(f"Unexpected error generating startup list: {e}")
         raise
 
-def extract_json_array(content):
-    start_index = content.find("[")
-    end_index = content.rfind("]") + 1
-    if start_index != -1 and end_index != -1:
-        return content[start_index:end_index]
-    else:
-        raise ValueError("Invalid response format: JSON array not found")
\ No newline at end of file
+def iter_stream_content(response):
+    # Perplexity streams OpenAI-style server-sent events: "data: {...}" lines with content deltas
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        choices = json.loads(data).get("choices") or [{}]
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
+
+def stream_startup_list(sector: str, sub_sector: str, num_startups: int = 5, angle: str = None):
+    if not check_perplexity_api_key():
+        raise ValueError("Perplexity API key is not set in the environment variables.")
+
+    logging.info(f"Streaming startup list for {sector} - {sub_sector}{f' ({angle})' if angle else ''} using Perplexity API")
+
+    payload, headers = build_startup_list_request(sector, sub_sector, num_startups, angle, stream=True)
+    parser = JsonArrayObjectParser()
+    count = 0
+    # Identical searches from other sessions share one upstream stream
+    cache_key = make_cache_key("perplexity", payload)
+    chunks = perplexity_single_flight.stream(
+        cache_key,
+        lambda: cassette.stream("perplexity", payload, lambda: post_completion_stream(payload, headers))
+    )
+    try:
+        for content in chunks:
+            # Once every session reading the stream has stopped, generation is cancelled so
+            # abandoned searches stop consuming tokens
+            check_deadline()
+            for startup in parser.feed(content):
+                count += 1
+                yield startup
+            if parser.finished:
+                break
+    finally:
+        chunks.close()
+
+    if parser.errors:
+        metrics.increment("perplexity.malformed_objects", parser.errors)
+    logging.info(f"Streamed {count} startups ({parser.errors} malformed objects skipped)")
+
+DISCOVERY_ANGLES = [
+    "early-stage companies (pre-seed to Series A)",
+    "growth-stage companies (Series B or later)",
+    "companies headquartered in North America",
+    "companies headquartered in Europe",
+    "companies headquartered in Asia-Pacific",
+    "companies building hardware or novel physical technology",
+    "companies building software platforms, models or tooling",
+]
+DISCOVERY_MAX_WORKERS = 4
+
+def normalize_startup_name(name) -> str:
+    return "".join(char for char in str(name or "").lower() if char.isalnum())
+
+def merge_startups(existing: list, new: list) -> list:
+    # Appends startups whose normalized name isn't already present; returns the ones added
+    seen = {normalize_startup_name(startup.get('name')) for startup in existing}
+    added = []
+    for startup in new:
+        key = normalize_startup_name(startup.get('name'))
+        if key and key not in seen:
+            seen.add(key)
+            existing.append(startup)
+            added.append(startup)
+    return added
+
+def discover_startups(sector: str, sub_sector: str, angles: list = None, num_startups_per_angle: int = 5):
+    # Fans a sub-sector query out into one query per angle and yields (angle, startups)
+    # as each query completes, so callers can render and merge results incrementally
+    angles = angles or DISCOVERY_ANGLES
+    executor = ThreadPoolExecutor(max_workers=DISCOVERY_MAX_WORKERS)
+    workers_deadline = Deadline(math.inf, name="startup discovery workers", parent=get_deadline())
+    with deadline_scope(deadline=workers_deadline):
+        futures = {
+            submit_with_context(executor, generate_startup_list, sector, sub_sector, num_startups_per_angle, angle): angle
+            for angle in angles
+        }
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=DEADLINE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                angle = futures[future]
+                try:
+                    yield angle, future.result()
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logging.error(f"Startup discovery query failed for {sector} - {sub_sector} ({angle}): {e}")
+                    yield angle, []
+            check_deadline()
+    finally:
+        # Once the caller stops listening or its deadline passes, queued queries are dropped and
+        # running ones stop at their next deadline check, without blocking the caller on them
+        workers_deadline.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
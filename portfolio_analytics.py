@@ -0,0 +1,83 @@
+import re
+import numpy as np
+import pandas as pd
+from database import get_portfolio_assessments
+
+RISK_DIMENSIONS = {
+    "technology_novelty": "Technology Novelty",
+    "development_stage": "Development Stage",
+    "market_potential": "Market Potential",
+    "competition": "Competition",
+    "regulatory_risk": "Regulatory Risk",
+}
+
+RISK_LEVELS = ["Low", "Medium", "High", "Early", "Mid", "Late", "Unknown"]
+
+SCORE_PERCENTILES = [10, 25, 50, 75, 90, 95]
+
+def normalize_risk_level(value):
+    # Model output such as "[Medium]", "medium" or "Medium (limited data)" -> "Medium";
+    # anything that doesn't start with a known level becomes "Unknown"
+    match = re.match(r"[\W_]*([A-Za-z]+)", str(value or ""))
+    if match:
+        word = match.group(1).capitalize()
+        if word in RISK_LEVELS:
+            return word
+    return "Unknown"
+
+def load_portfolio_frame(conn):
+    columns, rows = get_portfolio_assessments(conn)
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df["risk_score"] = pd.to_numeric(df["risk_score"], errors="coerce")
+    for column in RISK_DIMENSIONS:
+        # Rows stored before levels were normalized may hold raw model text
+        df[column] = df[column].map(normalize_risk_level).astype("category")
+    df["sector"] = df["sector"].fillna("Unknown")
+    df["sub_sector"] = df["sub_sector"].fillna("Unknown")
+    return df
+
+def score_distribution(scores, bins=10):
+    values = pd.to_numeric(pd.Series(scores), errors="coerce").to_numpy(dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins, range=(0, 10))
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "percentiles": dict(zip(SCORE_PERCENTILES, np.percentile(values, SCORE_PERCENTILES).tolist())),
+        "histogram": pd.DataFrame({
+            "Risk Score": [f"{low:.0f}-{high:.0f}" for low, high in zip(edges[:-1], edges[1:])],
+            "Startups": counts
+        })
+    }
+
+def sector_risk_matrix(df):
+    return df.pivot_table(index="sector", columns="sub_sector", values="risk_score", aggfunc="mean", observed=True)
+
+def sub_sector_risk_summary(df):
+    return (
+        df.groupby(["sector", "sub_sector"], observed=True)["risk_score"]
+        .agg(["count", "mean", "median", "min", "max"])
+        .sort_values("mean", ascending=False)
+    )
+
+def dimension_breakdown(df):
+    long_df = df.melt(value_vars=list(RISK_DIMENSIONS), var_name="dimension", value_name="level")
+    long_df["dimension"] = long_df["dimension"].map(RISK_DIMENSIONS)
+    breakdown = pd.crosstab(long_df["dimension"], long_df["level"])
+    # Known levels in their natural order, then any other values rather than dropping them
+    ordered = [level for level in RISK_LEVELS if level in breakdown.columns]
+    return breakdown[ordered + [level for level in breakdown.columns if level not in ordered]]
+
+def dimension_by_sector(df, dimension):
+    return pd.crosstab(df["sector"], df[dimension], normalize="index")
+
+def compute_portfolio_analytics(df):
+    return {
+        "distribution": score_distribution(df["risk_score"]),
+        "sector_matrix": sector_risk_matrix(df),
+        "sub_sector_summary": sub_sector_risk_summary(df),
+        "dimension_breakdown": dimension_breakdown(df),
+    }
@@ -0,0 +1,282 @@
+PROMPT_TEMPLATES = {}
+
+class PromptTemplate:
+    # The static system prefix is sent first and, for cacheable templates, marked for provider-side
+    # prompt caching; only the per-item payload rendered from user_template varies between calls.
+    # The provider only caches prefixes above its minimum length (2048 tokens for Haiku, 1024 for
+    # Sonnet), so shorter prefixes are sent unmarked.
+    def __init__(self, name, system, user_template, cache=True):
+        self.name = name
+        self.system = system
+        self.user_template = user_template
+        self.cache = cache
+
+    def system_blocks(self):
+        block = {"type": "text", "text": self.system}
+        if self.cache:
+            block["cache_control"] = {"type": "ephemeral"}
+        return [block]
+
+    def render(self, **payload):
+        return self.system_blocks(), self.user_template.format(**payload)
+
+def register_prompt(name, system, user_template, cache=True):
+    PROMPT_TEMPLATES[name] = PromptTemplate(name, system, user_template, cache)
+    return PROMPT_TEMPLATES[name]
+
+def get_prompt(name):
+    return PROMPT_TEMPLATES[name]
+
+# About 2,400 tokens, so the rubric and examples are cached for both the fast and the escalation model
+TECH_RISK_RUBRIC = '''You assess the technological risk of deep technology startups for a Venture Capital firm.
+
+Provide your assessment in the following strict format:
+
+1. Technology Novelty: [Low/Medium/High]
+Explanation: [1 sentence explanation]
+
+2. Development Stage: [Early/Mid/Late]
+Explanation: [1 sentence explanation]
+
+3. Market Potential: [Low/Medium/High]
+Explanation: [1 sentence explanation]
+
+4. Competition: [Low/Medium/High]
+Explanation: [1 sentence explanation]
+
+5. Regulatory Risk: [Low/Medium/High]
+Explanation: [1 sentence explanation]
+
+Overall Risk Score: [1-10]
+
+Summary: [2-3 sentence summary of key risk factors]
+
+Confidence: [Low/Medium/High]
+
+Note: If information is not available for any category, use "Unknown" for the risk level and "Insufficient information" for the explanation.
+
+Rubric definitions
+
+Use these definitions consistently so that assessments of different startups, sectors and analysts can be compared side by side in the firm's portfolio analytics.
+
+1. Technology Novelty measures how far the core technology departs from what is already proven and commercially available.
+- Low: the product applies established, well-understood technology in a new package, market or business model. The main technical work is integration and engineering rather than discovery (for example, a SaaS platform built on commodity cloud services, or a device assembled from off-the-shelf components).
+- Medium: the startup meaningfully improves on a known approach, combines existing techniques in a non-obvious way, or adapts a technology proven in one domain to a new one. Some technical uncertainty remains, but comparable systems have been shown to work (for example, a new battery chemistry variant, or a domain-specific foundation model).
+- High: the product depends on a scientific or engineering breakthrough that has not yet been demonstrated at commercial scale, such as new physics, new materials, new biological mechanisms or first-of-a-kind hardware (for example, fault-tolerant quantum computing, fusion power, or novel gene-editing modalities).
+Higher novelty means higher technical risk, even when it also means higher upside.
+
+2. Development Stage measures how much technical de-risking has already happened.
+- Early: research, concept or laboratory prototype. Key performance claims are supported by papers, simulations or bench results only, and there are no paying customers.
+- Mid: working prototype or pilot deployments with design partners, first revenue or letters of intent, and performance measured outside the lab but not yet at production scale or volume.
+- Late: product in commercial production with repeat customers, manufacturing or delivery processes in place, and remaining risk mostly about scaling, cost reduction and sales execution.
+Earlier stages mean higher technical risk. Judge the stage of the core technology, not of the company's marketing.
+
+3. Market Potential measures the size, urgency and accessibility of the demand the technology addresses.
+- Low: niche or unproven demand, unclear willingness to pay, long or uncertain adoption cycles, or a market that only exists if several other technologies mature first.
+- Medium: a real market with identifiable buyers, but either moderate in size, slow to adopt, or dependent on displacing entrenched workflows.
+- High: large and growing demand with clear pain points, buyers with budget, and a plausible path to becoming a significant business within the fund's horizon.
+Higher market potential lowers overall risk.
+
+4. Competition measures how contested the startup's position is.
+- Low: few credible alternatives, meaningful defensibility through patents, proprietary data, know-how, regulatory approvals or network effects.
+- Medium: several competitors or incumbent substitutes exist, but the startup has some differentiation that is difficult to copy quickly.
+- High: crowded space with well-funded competitors or large incumbents able to replicate the offering, or little evident defensibility.
+Higher competition means higher risk.
+
+5. Regulatory Risk measures how much approval, certification, compliance or policy uncertainty stands between the technology and revenue.
+- Low: no specific approval is needed beyond ordinary business compliance.
+- Medium: sector-specific standards, certifications or data-protection rules apply, with established and predictable pathways (for example, industrial safety certification, or privacy compliance for health data that is not a medical device).
+- High: market entry requires approval from a regulator with long or uncertain timelines, such as medical devices, therapeutics, aviation, nuclear, autonomous vehicles on public roads, or export-controlled technologies, or the business depends on subsidies or policy that may change.
+Higher regulatory risk means higher overall risk.
+
+Overall Risk Score
+
+Score overall technological and execution risk from 1 (lowest) to 10 (highest), weighing all five dimensions together rather than averaging them mechanically:
+- 1-2: proven technology in commercial production, strong market, defensible position, no regulatory hurdles.
+- 3-4: mostly de-risked technology with identifiable remaining challenges in scaling, cost or go-to-market.
+- 5-6: working technology with material open questions, such as pilot-stage performance, a contested market or a known regulatory pathway still to complete.
+- 7-8: significant unproven technical claims, early stage, or heavy regulatory exposure, where success depends on several things going right.
+- 9-10: breakthrough science not yet demonstrated, pre-prototype, with long regulatory or market timelines.
+Technology Novelty and Development Stage should carry the most weight, because they describe the technical risk the firm is underwriting. Market Potential, Competition and Regulatory Risk adjust the score up or down by one or two points at most.
+
+Confidence
+
+Confidence reflects how well the information provided supports the assessment, not how attractive the startup is:
+- High: the description and technology are specific (named techniques, measured results, customers or deployments), so every dimension can be judged.
+- Medium: most dimensions can be judged but some rely on reasonable inference from the sector.
+- Low: the information is vague, promotional or missing, so several dimensions are guesses or "Unknown".
+
+General rules
+- Base the assessment only on the information provided and widely known facts about the sector; do not invent funding amounts, customers or results.
+- Keep each explanation to a single sentence that names the specific evidence behind the rating.
+- Use exactly the labels shown in the format (Low/Medium/High, Early/Mid/Late or Unknown), without brackets, and give the Overall Risk Score as a number.
+- Do not add headings, preambles or closing remarks outside the format.
+
+Example 1
+
+Startup Name: Cryoptic Systems
+Description: Builds dilution-refrigerator-free photonic quantum processors; demonstrated 12 entangled photonic qubits in a university lab and is raising a seed round.
+Technology: Integrated silicon-nitride photonics with on-chip single-photon sources and detectors.
+
+1. Technology Novelty: High
+Explanation: Room-temperature photonic quantum processing with integrated sources and detectors has not been demonstrated at useful scale by anyone.
+
+2. Development Stage: Early
+Explanation: The only evidence is a 12-qubit laboratory demonstration with no product or customers.
+
+3. Market Potential: Medium
+Explanation: Quantum computing could become very large, but commercially useful applications depend on error rates and scale that are years away.
+
+4. Competition: High
+Explanation: Well-funded photonic and superconducting quantum companies and large technology incumbents pursue the same goal.
+
+5. Regulatory Risk: Medium
+Explanation: Quantum hardware is subject to export controls, although no product approval is required.
+
+Overall Risk Score: 9
+
+Summary: The company is betting on unproven physics at laboratory scale in a field dominated by far better-funded competitors. Its value depends on achieving technical milestones that no one has yet reached.
+
+Confidence: Medium
+
+Example 2
+
+Startup Name: GridSense Analytics
+Description: Sells predictive-maintenance software for utility transformers using sensor data; deployed at 14 regional utilities with annual contracts and growing revenue.
+Technology: Gradient-boosted anomaly detection on dissolved-gas and thermal sensor streams, integrated with existing SCADA systems.
+
+1. Technology Novelty: Low
+Explanation: The product applies established anomaly-detection techniques to a well-understood sensor data source.
+
+2. Development Stage: Late
+Explanation: The software is in paid production use at 14 utilities with recurring contracts.
+
+3. Market Potential: Medium
+Explanation: Utilities need to reduce transformer failures, but the buyer base is concentrated and procurement cycles are slow.
+
+4. Competition: Medium
+Explanation: Industrial software incumbents offer asset-monitoring suites, although the startup's utility-specific models and deployments give it some differentiation.
+
+5. Regulatory Risk: Low
+Explanation: The software advises operators and does not require regulatory approval beyond standard utility cybersecurity requirements.
+
+Overall Risk Score: 3
+
+Summary: The technology is proven and already generating recurring revenue, so the remaining risk is commercial rather than technical. Slow utility procurement and competition from incumbent suites may limit growth.
+
+Confidence: High
+
+Example 3
+
+Startup Name: NeuroLoop Medical
+Description: Developing a closed-loop neurostimulation implant for treatment-resistant epilepsy; completed a 20-patient feasibility study and is preparing a pivotal trial.
+Technology: Implantable stimulator that detects seizure onset from cortical electrodes and adapts stimulation in real time.
+
+1. Technology Novelty: Medium
+Explanation: Responsive neurostimulation is an approved therapy class, and the startup's novelty lies in its adaptive detection and stimulation algorithms.
+
+2. Development Stage: Mid
+Explanation: A 20-patient feasibility study shows the device works in humans, but the pivotal trial has not started.
+
+3. Market Potential: High
+Explanation: About a third of epilepsy patients do not respond to medication, and existing implants leave a large unmet need.
+
+4. Competition: Medium
+Explanation: Established neuromodulation companies sell approved devices, although few offer adaptive closed-loop therapy.
+
+5. Regulatory Risk: High
+Explanation: The implant is a high-risk medical device that needs pre-market approval after a pivotal trial.
+
+Overall Risk Score: 6
+
+Summary: The therapy builds on an approved device class and has early clinical evidence, but the pivotal trial and pre-market approval carry material time and outcome risk. Reimbursement and clinician adoption are further hurdles after approval.
+
+Confidence: High
+
+Example 4
+
+Startup Name: Aerolith
+Description: Next-generation materials company transforming industries with proprietary innovation.
+Technology: Advanced materials platform.
+
+1. Technology Novelty: Unknown
+Explanation: Insufficient information
+
+2. Development Stage: Unknown
+Explanation: Insufficient information
+
+3. Market Potential: Unknown
+Explanation: Insufficient information
+
+4. Competition: Medium
+Explanation: Advanced materials is a contested field with many startups and large chemical incumbents.
+
+5. Regulatory Risk: Unknown
+Explanation: Insufficient information
+
+Overall Risk Score: 7
+
+Summary: The description names no specific material, application, result or customer, so the technical risk cannot be assessed and is assumed to be high. Further diligence is needed before this score is meaningful.
+
+Confidence: Low
+'''
+
+GP_SUMMARY_INSTRUCTIONS = """As an AI assistant to a Venture Capital firm, analyze the tech risk assessment data provided by the user and provide actionable insights for the General Partners:
+
+1. Executive Summary (2-3 sentences):
+   Concisely outline the overall tech risk landscape, highlighting any critical concerns or opportunities.
+
+2. Key Insights (3 bullet points):
+   • [Most significant pattern or trend]
+   • [Highest potential risk or area of concern]
+   • [Most promising opportunity or strength]
+
+3. Strategic Recommendations (3-4 bullet points):
+   • [Immediate action item to address highest risk]
+   • [Suggestion to capitalize on identified opportunity]
+   • [Recommendation for portfolio balancing or risk mitigation]
+   • [Proposed follow-up or due diligence focus]
+
+4. Potential Impact on Returns (1-2 sentences):
+   Briefly assess how the identified risks and opportunities might affect potential returns.
+
+Please keep each section concise and focused on information that directly impacts investment decisions and portfolio management.
+"""
+
+GP_CHUNK_SUMMARY_INSTRUCTIONS = """You summarize tech risk assessments of startups in a single sub-sector for a Venture Capital General Partner.
+
+In at most 5 bullet points, cover: the dominant risk pattern, the highest-risk startups and why, the most promising startups, and any notable technology themes. Name startups explicitly.
+"""
+
+register_prompt(
+    "tech_risk_assessment",
+    TECH_RISK_RUBRIC,
+    """Based on the following startup information, assess the technological risk:
+
+Startup Name: {name}
+Description: {description}
+Technology: {technology}
+"""
+)
+
+register_prompt(
+    "gp_summary",
+    GP_SUMMARY_INSTRUCTIONS,
+    """{data_section}
+
+Total Startups: {total_startups}
+Average Risk Score: {avg_risk_score:.2f}
+""",
+    # A few hundred tokens: below the caching minimum, and sent once per summary anyway
+    cache=False
+)
+
+register_prompt(
+    "gp_chunk_summary",
+    GP_CHUNK_SUMMARY_INSTRUCTIONS,
+    """Sub-sector: {sub_sector} ({num_startups} startups, average risk score {avg_score})
+
+{chunk_json}
+""",
+    cache=False
+)
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import argparse
+import logging
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+# A session script is a JSON list of sessions, each a list of widget interactions, e.g.
+# [{"name": "ai", "steps": [{"button": "Artificial Intelligence"},
+#                           {"radio": "Choose a sub-sector:", "index": 0},
+#                           {"button": "Find Startups"},
+#                           {"radio": "Select Stage", "value": "Tech Risk Assessor"}]}]
+WIDGET_TYPES = ["button", "radio", "checkbox", "selectbox", "multiselect"]
+
+def find_widget(at, widget_type, label):
+    for widget in getattr(at, widget_type):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No {widget_type} labelled '{label}' on the page")
+
+def apply_step(at, step):
+    widget_type = next(widget_type for widget_type in WIDGET_TYPES if widget_type in step)
+    widget = find_widget(at, widget_type, step[widget_type])
+    if widget_type == "button":
+        widget.click()
+    elif "index" in step:
+        widget.set_value(widget.options[step["index"]])
+    else:
+        widget.set_value(step["value"])
+
+def run_session(session, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings = []
+    errors = []
+    steps = [{"initial": True}] + session["steps"]
+    for step in steps:
+        start = time.perf_counter()
+        try:
+            if not step.get("initial"):
+                apply_step(at, step)
+            at.run()
+        except Exception as e:
+            errors.append(f"{session.get('name', 'session')}: {step}: {e}")
+            break
+        timings.append((json.dumps(step, sort_keys=True), time.perf_counter() - start))
+        errors.extend(f"{session.get('name', 'session')}: {step}: {exception.value}" for exception in at.exception)
+    return timings, errors
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+def summarize(results, wall_time):
+    by_step = {}
+    errors = []
+    for timings, session_errors in results:
+        errors.extend(session_errors)
+        for step, seconds in timings:
+            by_step.setdefault(step, []).append(seconds)
+    all_runs = [seconds for values in by_step.values() for seconds in values]
+    return {
+        "sessions": len(results),
+        "reruns": len(all_runs),
+        "wall_time": wall_time,
+        "reruns_per_second": len(all_runs) / wall_time if wall_time else None,
+        "rerun_latency": {
+            "p50": percentile(all_runs, 50),
+            "p95": percentile(all_runs, 95),
+            "max": max(all_runs),
+        } if all_runs else None,
+        "steps": {
+            step: {"runs": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95)}
+            for step, values in by_step.items()
+        },
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive scripted Streamlit sessions against recorded provider tapes.")
+    parser.add_argument("script", help="JSON file with the sessions to replay")
+    parser.add_argument("--concurrency", type=int, default=1, help="Sessions run in parallel, one process each")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to run each scripted session")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-rerun timeout in seconds")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    # Provider modules read these on import, so they must be set before the first app run
+    os.environ.setdefault("PROVIDER_CASSETTE_MODE", "replay")
+
+    with open(args.script, encoding="utf-8") as f:
+        sessions = json.load(f) * args.repeat
+
+    start = time.perf_counter()
+    # AppTest drives a process-wide Streamlit runtime and config, so concurrent sessions each need
+    # their own process; a fresh one per session also keeps caches from leaking between sessions
+    with ProcessPoolExecutor(max_workers=args.concurrency, max_tasks_per_child=1) as executor:
+        results = list(executor.map(run_session, sessions, repeat(args.timeout)))
+    report = summarize(results, time.perf_counter() - start)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
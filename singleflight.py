@@ -0,0 +1,131 @@
+import logging
+import threading
+from concurrent.futures import Future
+from deadline import DeadlineExceeded, check_deadline, get_deadline, wait_future, DEADLINE_POLL_SECONDS
+from metrics import metrics
+
+class StreamBroadcast:
+    # Buffers the chunks of one upstream stream so every subscriber receives all of them,
+    # including subscribers that join after the first chunks have arrived
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+    def publish(self, chunk):
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def close(self, error=None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def chunks_from(self, index):
+        # Blocks until there are chunks past index or the stream ended, honouring the current deadline
+        deadline = get_deadline()
+        with self.condition:
+            while index >= len(self.chunks) and not self.done:
+                if deadline is not None:
+                    deadline.check()
+                    self.condition.wait(min(DEADLINE_POLL_SECONDS, deadline.remaining()))
+                else:
+                    self.condition.wait(DEADLINE_POLL_SECONDS)
+            return self.chunks[index:], self.done, self.error
+
+class SingleFlight:
+    # Coalesces identical in-flight calls across Streamlit sessions: the first caller for a key
+    # runs the function and later callers wait for and share its result (or exception).
+    def __init__(self, name):
+        self.name = name
+        self.calls = {}
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+
+        if not leader:
+            logging.info(f"Coalescing identical in-flight {self.name} request")
+            metrics.increment(f"{self.name}.coalesced")
+            try:
+                return wait_future(future)
+            except DeadlineExceeded:
+                # The leader's deadline may have been cancelled while ours is still live
+                check_deadline()
+                return self.do(key, fn, *args, **kwargs)
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def stream(self, key, stream_fn):
+        # Streaming counterpart of do(): the first caller starts stream_fn() on a background thread
+        # and every caller for the key, first or later, replays its chunks. The upstream stream is
+        # not tied to any one caller's deadline and stops early only once all callers have left.
+        with self.lock:
+            broadcast = self.streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = StreamBroadcast()
+                self.streams[key] = broadcast
+            broadcast.subscribers += 1
+
+        if leader:
+            threading.Thread(target=self.pump, args=(key, broadcast, stream_fn), name=f"{self.name}-stream", daemon=True).start()
+        else:
+            logging.info(f"Coalescing identical in-flight {self.name} stream")
+            metrics.increment(f"{self.name}.coalesced")
+
+        index = 0
+        try:
+            while True:
+                chunks, done, error = broadcast.chunks_from(index)
+                for chunk in chunks:
+                    yield chunk
+                index += len(chunks)
+                if done and index >= len(broadcast.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            with self.lock:
+                broadcast.subscribers -= 1
+
+    def pump(self, key, broadcast, stream_fn):
+        upstream = None
+        error = None
+        try:
+            upstream = stream_fn()
+            for chunk in upstream:
+                broadcast.publish(chunk)
+                with self.lock:
+                    if broadcast.subscribers == 0:
+                        # Everyone stopped listening; later callers must start a fresh stream
+                        del self.streams[key]
+                        break
+        except Exception as e:
+            error = e
+        finally:
+            if upstream is not None:
+                upstream.close()
+            with self.lock:
+                if self.streams.get(key) is broadcast:
+                    del self.streams[key]
+            broadcast.close(error)
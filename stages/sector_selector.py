@@ -1,10 +1,13 @@
 import streamlit as st
 from claude_api import generate_sector_info
 import logging
-from stages import startup_finder
+from deadline import deadline_scope
+from utils import action_fragment, request_stage_transition
 
 logging.basicConfig(level=logging.INFO)
 
+SECTOR_INFO_DEADLINE_SECONDS = 60
+
 def initialize_session_state():
     if 'current_stage' not in st.session_state:
         st.session_state.current_stage = 'Sector Selector'
@@ -14,8 +17,6 @@ def initialize_session_state():
         st.session_state.sector_selected = False
     if 'sector_info' not in st.session_state:
         st.session_state.sector_info = None
-    if 'show_startup_finder' not in st.session_state:
-        st.session_state.show_startup_finder = False
     if 'selected_sector' not in st.session_state:
         st.session_state.selected_sector = None
     if 'selected_sub_sector' not in st.session_state:
@@ -24,12 +25,39 @@ def initialize_session_state():
 def reset_sector_selector():
     st.session_state.sector_selected = False
     st.session_state.sector_info = None
-    st.session_state.show_startup_finder = False
     st.session_state.selected_sector = None
     st.session_state.selected_sub_sector = None
     st.session_state.current_stage = 'Sector Selector'
     st.session_state.progress = 0.33
 
+@action_fragment
+def render_sector_overview():
+    # Choosing a sub-sector only reruns this panel
+    st.subheader(f"{st.session_state.selected_sector} Overview")
+    sector_info = st.session_state.sector_info
+    if sector_info:
+        st.write("Sector Summary:")
+        st.write(sector_info['summary'])
+
+        st.write("Latest Sector Trends:")
+        st.write(sector_info['trends'])
+
+        st.subheader("Sub-sectors")
+        sub_sectors = list(sector_info['sub_sectors'].keys())
+        selected_sub_sector = st.radio("Choose a sub-sector:", sub_sectors, key="sub_sector_select")
+
+        st.write(f"**{selected_sub_sector}**: {sector_info['sub_sectors'][selected_sub_sector]}")
+
+        if st.button("Find Startups"):
+            st.session_state.selected_sub_sector = selected_sub_sector
+            st.session_state.progress = 0.66
+            st.session_state.reset_startup_finder = True
+            logging.info(f"Selected {st.session_state.selected_sector} - {selected_sub_sector}, moving to Startup Finder")
+            request_stage_transition("Startup Finder")
+    else:
+        st.error("No sector information available. Please go back and select a sector again.")
+        reset_sector_selector()
+
 def run(conn):
     initialize_session_state()
 
@@ -59,7 +87,8 @@ def run(conn):
                     with st.spinner("Generating sector information..."):
                         try:
                             logging.info(f"Generating sector information for {sector}")
-                            st.session_state.sector_info = generate_sector_info(sector)
+                            with deadline_scope(SECTOR_INFO_DEADLINE_SECONDS, name="sector info"):
+                                st.session_state.sector_info = generate_sector_info(sector)
                             logging.info(f"Sector information generated successfully: {st.session_state.sector_info}")
                         except Exception as e:
                             logging.error(f"Error generating sector information: {str(e)}")
@@ -73,31 +102,7 @@ def run(conn):
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            st.subheader(f"{st.session_state.selected_sector} Overview")
-            sector_info = st.session_state.sector_info
-            if sector_info:
-                st.write("Sector Summary:")
-                st.write(sector_info['summary'])
-                
-                st.write("Latest Sector Trends:")
-                st.write(sector_info['trends'])
-                
-                st.subheader("Sub-sectors")
-                sub_sectors = list(sector_info['sub_sectors'].keys())
-                selected_sub_sector = st.radio("Choose a sub-sector:", sub_sectors, key="sub_sector_select")
-                
-                st.write(f"**{selected_sub_sector}**: {sector_info['sub_sectors'][selected_sub_sector]}")
-
-                if st.button("Find Startups"):
-                    st.session_state.selected_sub_sector = selected_sub_sector
-                    st.session_state.show_startup_finder = True
-                    st.session_state.current_stage = "Startup Finder"
-                    st.session_state.progress = 0.66
-                    st.success(f"You have selected the {st.session_state.selected_sector} sector and the {selected_sub_sector} sub-sector.")
-                    st.info("Finding startups...")
-            else:
-                st.error("No sector information available. Please go back and select a sector again.")
-                reset_sector_selector()
+            render_sector_overview()
 
         with col2:
             st.write(" ")
@@ -106,7 +111,4 @@ def run(conn):
                 reset_sector_selector()
                 st.rerun()
 
-    if st.session_state.show_startup_finder:
-        startup_finder.run(conn)
-
     logging.info(f"Current session state: {st.session_state}")
@@ -1,15 +1,89 @@
 import streamlit as st
-from perplexity_api import generate_startup_list, check_perplexity_api_key
+from perplexity_api import generate_startup_list, stream_startup_list, check_perplexity_api_key, discover_startups, merge_startups
 import logging
-from stages import tech_risk_assessor
 from tenacity import retry, stop_after_attempt, wait_exponential, RetryError
+from deadline import DeadlineExceeded, check_deadline, deadline_scope, retry_unless_deadline
+from utils import action_fragment, request_stage_transition
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+STARTUP_SEARCH_DEADLINE_SECONDS = 120
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), retry=retry_unless_deadline)
 def generate_startup_list_with_retry(sector, sub_sector):
     return generate_startup_list(sector, sub_sector)
 
+def run_expanded_discovery(sector, sub_sector):
+    if 'startups' not in st.session_state:
+        st.session_state.startups = []
+    startups = st.session_state.startups
+    with st.status("Discovering startups across stages, geographies and technologies...", expanded=True) as status:
+        try:
+            with deadline_scope(STARTUP_SEARCH_DEADLINE_SECONDS, name="startup discovery"):
+                for angle, batch in discover_startups(sector, sub_sector):
+                    added = merge_startups(startups, batch)
+                    status.write(f"**{angle}**: {len(added)} new ({len(startups)} total)")
+                    if added:
+                        status.write(", ".join(startup.get('name', 'Unnamed Startup') for startup in added))
+        except DeadlineExceeded as e:
+            # Keep what was found so far unless the whole action was cancelled
+            check_deadline()
+            logging.warning(f"Startup discovery timed out: {str(e)}")
+        status.update(label=f"Discovery complete: {len(startups)} startups found", state="complete", expanded=False)
+    logging.info(f"Expanded discovery found {len(startups)} startups")
+
+def stream_startups(sector, sub_sector):
+    # Render companies as soon as each one is parsed; fall back to the blocking request if the stream yields nothing
+    startups = []
+    with st.status("Searching for startups...", expanded=True) as status:
+        try:
+            with deadline_scope(STARTUP_SEARCH_DEADLINE_SECONDS, name="startup search"):
+                for startup in stream_startup_list(sector, sub_sector):
+                    startups.append(startup)
+                    status.write(f"{len(startups)}. **{startup.get('name', 'Unnamed Startup')}**: {startup.get('description', '')}")
+        except DeadlineExceeded as e:
+            check_deadline()
+            logging.warning(f"Startup search timed out after {len(startups)} startups: {str(e)}")
+        except Exception as e:
+            logging.error(f"Error streaming startup list: {str(e)}")
+        status.update(label=f"Found {len(startups)} startups", state="complete", expanded=False)
+    if startups:
+        st.session_state.startups = startups
+        logging.info(f"Streamed {len(startups)} startups")
+
+@action_fragment
+def render_startup_selection():
+    # Selecting and confirming startups only reruns this panel, not the startup list above it
+    selected_startups = st.multiselect(
+        "Select startups for further analysis:",
+        options=[startup.get('name', 'Unnamed Startup') for startup in st.session_state.startups],
+        key="selected_startups"
+    )
+
+    # Confirm Startup Selection button
+    if st.button("Confirm Startup Selection"):
+        if selected_startups:
+            # Record where each startup was found; it is stored and summarized under this sub-sector
+            st.session_state.analyzed_startups = [
+                dict(startup, sector=st.session_state.selected_sector, sub_sector=st.session_state.selected_sub_sector)
+                for startup in st.session_state.startups if startup.get('name') in selected_startups
+            ]
+            st.session_state.startup_selection_confirmed = True
+            st.success("Startup selection confirmed!")
+            st.info("Please proceed to the Tech Risk Assessor stage.")
+            logging.info(f"Selected startups: {selected_startups}")
+            logging.info(f"Analyzed startups: {st.session_state.analyzed_startups}")
+        else:
+            st.warning("Please select at least one startup before confirming.")
+
+    # Proceed to Tech Risk Assessor button
+    if st.session_state.get('startup_selection_confirmed', False):
+        if st.button("Proceed to Tech Risk Assessor"):
+            logging.info("Proceeding to Tech Risk Assessor")
+            logging.info(f"Analyzed startups in session state: {st.session_state.analyzed_startups}")
+            st.session_state.progress = 1
+            request_stage_transition("Tech Risk Assessor")
+
 def run(conn):
     st.header("Startup Finder")
 
@@ -37,15 +111,33 @@ def run(conn):
         st.warning("Please complete the Sector Selector stage first.")
         return
 
+    expanded_discovery = st.checkbox(
+        "Expanded discovery (parallel queries by stage, geography and technology)",
+        key="expanded_discovery"
+    )
+
     # Generate startups for selected sector and sub-sector
+    if "startups" not in st.session_state and expanded_discovery:
+        run_expanded_discovery(st.session_state.selected_sector, st.session_state.selected_sub_sector)
+        if not st.session_state.startups:
+            st.error("No startups were found. Please try again or choose a different sector/sub-sector.")
+            del st.session_state.startups
+            return
+
+    if "startups" not in st.session_state:
+        stream_startups(st.session_state.selected_sector, st.session_state.selected_sub_sector)
+
     if "startups" not in st.session_state:
         with st.spinner("Generating startup list..."):
             try:
-                st.session_state.startups = generate_startup_list_with_retry(st.session_state.selected_sector, st.session_state.selected_sub_sector)
+                with deadline_scope(STARTUP_SEARCH_DEADLINE_SECONDS, name="startup search"):
+                    st.session_state.startups = generate_startup_list_with_retry(st.session_state.selected_sector, st.session_state.selected_sub_sector)
                 if not st.session_state.startups:
                     st.error("No startups were found. Please try again or choose a different sector/sub-sector.")
                     return
                 logging.info(f"Generated {len(st.session_state.startups)} startups")
+            except DeadlineExceeded:
+                raise
             except RetryError as e:
                 st.error(f"An error occurred while generating the startup list: {str(e)}")
                 logging.error(f"Error in startup generation: {str(e)}")
@@ -69,36 +161,12 @@ def run(conn):
             st.write(f"Funding: {startup.get('funding', 'N/A')}")
             st.write(f"Technology: {startup.get('technology', 'No technology information available')}")
 
-    # Allow startup selection
-    selected_startups = st.multiselect(
-        "Select startups for further analysis:",
-        options=[startup.get('name', 'Unnamed Startup') for startup in st.session_state.startups],
-        key="selected_startups"
-    )
-
-    # Confirm Startup Selection button
-    if st.button("Confirm Startup Selection"):
-        if selected_startups:
-            st.session_state.analyzed_startups = [
-                startup for startup in st.session_state.startups if startup.get('name') in selected_startups
-            ]
-            st.session_state.startup_selection_confirmed = True
-            st.success("Startup selection confirmed!")
-            st.info("Please proceed to the Tech Risk Assessor stage.")
-            logging.info(f"Selected startups: {selected_startups}")
-            logging.info(f"Analyzed startups: {st.session_state.analyzed_startups}")
-        else:
-            st.warning("Please select at least one startup before confirming.")
+    if st.button("Discover More Startups"):
+        run_expanded_discovery(st.session_state.selected_sector, st.session_state.selected_sub_sector)
+        st.rerun()
 
-    # Proceed to Tech Risk Assessor button
-    if st.session_state.get('startup_selection_confirmed', False):
-        if st.button("Proceed to Tech Risk Assessor"):
-            logging.info("Proceeding to Tech Risk Assessor")
-            logging.info(f"Analyzed startups in session state: {st.session_state.analyzed_startups}")
-            st.session_state.current_stage = "Tech Risk Assessor"
-            st.session_state.progress = 1
-            tech_risk_assessor.run()
-            return
+    # Allow startup selection
+    render_startup_selection()
 
     # Logging
     logging.info(f"Current stage: {st.session_state.get('current_stage', 'Unknown')}")
@@ -1,13 +1,35 @@
 import streamlit as st
-from claude_api import assess_tech_risk, generate_claude_response
+from claude_api import assess_tech_risk, generate_claude_response, CLAUDE_ERROR_RESPONSE
+from llm_cache import make_cache_key, response_cache
+from prompts import get_prompt
+from database import save_startup, save_startup_assessment
+from perplexity_api import normalize_startup_name
+from portfolio_analytics import RISK_DIMENSIONS, normalize_risk_level, load_portfolio_frame, compute_portfolio_analytics, dimension_by_sector, score_distribution
 import logging
 import json
+import hashlib
+import math
+from concurrent.futures import ThreadPoolExecutor
 from tenacity import retry, stop_after_attempt, wait_fixed
+from utils import action_fragment
+from deadline import Deadline, DeadlineExceeded, check_deadline, deadline_scope, get_deadline, retry_unless_deadline, submit_with_context, wait_future
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
+ASSESSMENT_DEADLINE_SECONDS = 90
+GP_SUMMARY_DEADLINE_SECONDS = 120
+
+def continue_in_next_run(budget):
+    # A script run's action deadline covers only a few assessments. Rather than start work it
+    # can't finish, rerun the script: assessments are kept in session state, so the next run
+    # (with a fresh deadline) picks up where this one stopped.
+    deadline = get_deadline()
+    if deadline is not None and deadline.remaining() < budget:
+        logging.info(f"Continuing the tech risk assessment in a new run ({deadline.remaining():.0f}s left)")
+        st.rerun()
+
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(2), retry=retry_unless_deadline)
 def get_risk_assessment(startup_info):
     return assess_tech_risk(startup_info)
 
@@ -30,44 +52,171 @@ def parse_risk_score(risk_assessment):
         logging.error(f"Error parsing risk score: {str(e)}")
         return None
 
-def generate_gp_summary_and_next_steps(summary_data, avg_risk_score):
-    prompt = f"""
-As an AI assistant to a Venture Capital firm, analyze the following tech risk assessment data and provide actionable insights for the General Partners:
-
-```json
-{json.dumps(summary_data, indent=2)}
-```
-
-Average Risk Score: {avg_risk_score:.2f}
-
-1. Executive Summary (2-3 sentences):
-   Concisely outline the overall tech risk landscape, highlighting any critical concerns or opportunities.
-
-2. Key Insights (3 bullet points):
-   • [Most significant pattern or trend]
-   • [Highest potential risk or area of concern]
-   • [Most promising opportunity or strength]
-
-3. Strategic Recommendations (3-4 bullet points):
-   • [Immediate action item to address highest risk]
-   • [Suggestion to capitalize on identified opportunity]
-   • [Recommendation for portfolio balancing or risk mitigation]
-   • [Proposed follow-up or due diligence focus]
-
-4. Potential Impact on Returns (1-2 sentences):
-   Briefly assess how the identified risks and opportunities might affect potential returns.
-
-Please keep each section concise and focused on information that directly impacts investment decisions and portfolio management.
-"""
-    return generate_claude_response(prompt)
+def parse_risk_dimensions(risk_assessment):
+    labels = {label: column for column, label in RISK_DIMENSIONS.items()}
+    labels["Confidence"] = "confidence"
+    dimensions = {}
+    for line in risk_assessment.split('\n'):
+        if ':' not in line:
+            continue
+        label, value = line.split(':', 1)
+        column = labels.get(label.strip())
+        if column:
+            dimensions[column] = normalize_risk_level(value)
+    return dimensions
+
+def save_risk_assessment(conn, startup, risk_assessment, risk_score):
+    sector = startup.get('sector') or st.session_state.get('selected_sector')
+    sub_sector = startup.get('sub_sector') or st.session_state.get('selected_sub_sector')
+    startup_id = save_startup(conn, startup, sector, sub_sector)
+    save_startup_assessment(conn, startup_id, risk_score, risk_assessment, parse_risk_dimensions(risk_assessment))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_portfolio_analytics(_conn):
+    df = load_portfolio_frame(_conn)
+    return df, compute_portfolio_analytics(df)
+
+@action_fragment
+def render_portfolio_analytics(conn):
+    st.subheader("Portfolio Risk Analytics")
+    df, analytics = get_portfolio_analytics(conn)
+    if df.empty or analytics["distribution"] is None:
+        st.write("No stored assessments yet.")
+        return
+
+    distribution = analytics["distribution"]
+    cols = st.columns(3)
+    cols[0].metric("Assessed Startups", distribution["count"])
+    cols[1].metric("Mean Risk Score", f"{distribution['mean']:.2f}")
+    cols[2].metric("Median Risk Score", f"{distribution['percentiles'][50]:.2f}")
+    st.bar_chart(distribution["histogram"], x="Risk Score", y="Startups")
+    st.write("Risk Score Percentiles:")
+    st.table({f"p{p}": [f"{value:.2f}"] for p, value in distribution["percentiles"].items()})
+
+    st.write("Mean Risk Score by Sector and Sub-sector:")
+    st.dataframe(analytics["sector_matrix"].round(2))
+    st.dataframe(analytics["sub_sector_summary"].round(2))
+
+    st.write("Risk Levels by Dimension:")
+    st.dataframe(analytics["dimension_breakdown"])
+    dimension = st.selectbox("Dimension by sector:", list(RISK_DIMENSIONS), format_func=RISK_DIMENSIONS.get)
+    st.write("Share of startups (%) at each level:")
+    st.dataframe((dimension_by_sector(df, dimension) * 100).round(0))
+
+GP_SUMMARY_CHUNK_SIZE = 20
+GP_SUMMARY_MAX_WORKERS = 4
+
+def compact_json(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+def summary_bucket(name, num_buckets):
+    digest = hashlib.sha256(normalize_startup_name(name).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % num_buckets
+
+def chunk_summary_data(summary_data, chunk_size=GP_SUMMARY_CHUNK_SIZE):
+    # Group by sub-sector so each chunk summary is thematically coherent, then split large
+    # groups into hash buckets by startup name: adding or removing a startup only changes
+    # (and un-caches) the bucket it falls in, unless the bucket count has to double
+    groups = {}
+    for item in summary_data:
+        groups.setdefault(item.get('Sub-sector') or 'Unspecified', []).append(item)
+    chunks = []
+    for sub_sector in sorted(groups):
+        items = groups[sub_sector]
+        num_buckets = 1
+        while num_buckets * chunk_size < len(items):
+            num_buckets *= 2
+        buckets = {}
+        for item in items:
+            buckets.setdefault(summary_bucket(item.get('Name'), num_buckets), []).append(item)
+        for bucket in sorted(buckets):
+            chunks.append((sub_sector, sorted(buckets[bucket], key=lambda item: item.get('Name') or '')))
+    return chunks
+
+def summarize_chunk(sub_sector, items):
+    chunk_json = compact_json(items)
+    cache_key = make_cache_key("gp_chunk_summary", chunk_json)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        logging.info(f"Using cached GP chunk summary for {sub_sector} ({len(items)} startups)")
+        return cached
+
+    scores = [item['Risk Score'] for item in items if isinstance(item.get('Risk Score'), (int, float))]
+    avg_score = f"{sum(scores) / len(scores):.2f}" if scores else "N/A"
+    system, prompt = get_prompt("gp_chunk_summary").render(
+        sub_sector=sub_sector,
+        num_startups=len(items),
+        avg_score=avg_score,
+        chunk_json=chunk_json
+    )
+    summary = generate_claude_response(prompt, max_tokens=600, system=system, task="gp_chunk_summary")
+    if summary != CLAUDE_ERROR_RESPONSE:
+        response_cache.set(cache_key, summary)
+    return summary
+
+def map_gp_summaries(summary_data):
+    chunks = chunk_summary_data(summary_data)
+    logging.info(f"Summarizing {len(summary_data)} startups in {len(chunks)} chunks")
+    executor = ThreadPoolExecutor(max_workers=GP_SUMMARY_MAX_WORKERS)
+    workers_deadline = Deadline(math.inf, name="gp chunk summaries", parent=get_deadline())
+    try:
+        with deadline_scope(deadline=workers_deadline):
+            futures = [submit_with_context(executor, summarize_chunk, *chunk) for chunk in chunks]
+        summaries = [wait_future(future) for future in futures]
+    finally:
+        # Don't block the script thread on chunk summaries nobody is waiting for any more
+        workers_deadline.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+    # A failed chunk returns the error text; leave it out rather than summarize it as findings
+    sections = [
+        f"{sub_sector} ({len(items)} startups):\n{summary}"
+        for (sub_sector, items), summary in zip(chunks, summaries)
+        if summary != CLAUDE_ERROR_RESPONSE
+    ]
+    failed = [
+        (sub_sector, len(items))
+        for (sub_sector, items), summary in zip(chunks, summaries)
+        if summary == CLAUDE_ERROR_RESPONSE
+    ]
+    if not sections:
+        return None, failed
+    data_section = "Per sub-sector summaries of the tech risk assessments:\n\n" + "\n\n".join(sections)
+    if failed:
+        missing = ", ".join(f"{sub_sector} ({count} startups)" for sub_sector, count in failed)
+        data_section += f"\n\nNote: summaries are missing for {missing}. Treat the analysis as partial and do not draw conclusions about these startups."
+    return data_section, failed
 
-def run():
+def generate_gp_summary_and_next_steps(summary_data, avg_risk_score):
+    # Returns the summary and whether it is partial (some chunk summaries failed)
+    failed = []
+    if len(summary_data) <= GP_SUMMARY_CHUNK_SIZE:
+        data_section = f"Tech risk assessment data (JSON):\n{compact_json(summary_data)}"
+    else:
+        data_section, failed = map_gp_summaries(summary_data)
+        if data_section is None:
+            return CLAUDE_ERROR_RESPONSE, True
+
+    system, prompt = get_prompt("gp_summary").render(
+        data_section=data_section,
+        total_startups=len(summary_data),
+        avg_risk_score=avg_risk_score
+    )
+    summary = generate_claude_response(prompt, system=system, task="gp_summary")
+    if failed and summary != CLAUDE_ERROR_RESPONSE:
+        missing_startups = sum(count for _, count in failed)
+        summary = (
+            f"**Partial summary:** {missing_startups} of {len(summary_data)} startups could not be summarized "
+            f"and are not covered below.\n\n{summary}"
+        )
+    return summary, bool(failed)
+
+def run(conn=None):
     # Reset tech risk assessment related states
     if 'reset_tech_risk_assessor' not in st.session_state:
         st.session_state.reset_tech_risk_assessor = True
 
     if st.session_state.reset_tech_risk_assessor:
-        keys_to_clear = ['risk_assessments', 'gp_summary']
+        keys_to_clear = ['risk_assessments', 'gp_summary', 'gp_summary_key']
         for key in keys_to_clear:
             if key in st.session_state:
                 del st.session_state[key]
@@ -87,6 +236,8 @@ def run():
         if 'risk_assessments' not in st.session_state:
             st.session_state.risk_assessments = {}
 
+        # Only continue in a new run after progress in this one, so failing startups can't loop
+        assessed_this_run = 0
         for startup in st.session_state.analyzed_startups:
             try:
                 startup_name = startup['name']
@@ -100,12 +251,19 @@ def run():
                 })
 
                 if startup_name not in st.session_state.risk_assessments:
-                    risk_assessment = get_risk_assessment(startup_info)
+                    if assessed_this_run:
+                        continue_in_next_run(ASSESSMENT_DEADLINE_SECONDS)
+                    with deadline_scope(ASSESSMENT_DEADLINE_SECONDS, name=f"assessment of {startup_name}"):
+                        risk_assessment = get_risk_assessment(startup_info)
                     st.session_state.risk_assessments[startup_name] = risk_assessment
+                    assessed_this_run += 1
+                    risk_score = parse_risk_score(risk_assessment)
+                    if conn is not None and not risk_assessment.startswith("Error:"):
+                        save_risk_assessment(conn, startup, risk_assessment, risk_score)
+                        get_portfolio_analytics.clear()
                 else:
                     risk_assessment = st.session_state.risk_assessments[startup_name]
-
-                risk_score = parse_risk_score(risk_assessment)
+                    risk_score = parse_risk_score(risk_assessment)
 
                 if risk_score is not None:
                     st.write(f"Risk Score: {risk_score:.1f}/10")
@@ -116,6 +274,11 @@ def run():
                 st.text(risk_assessment)
                 logging.info(f"Completed risk assessment for {startup_name}")
 
+            except DeadlineExceeded as e:
+                # Give up on this startup only; stop entirely if the whole action was cancelled
+                check_deadline()
+                logging.warning(f"Risk assessment for {startup_name} timed out: {str(e)}")
+                st.error(f"The assessment of {startup_name} took too long. Please try again.")
             except Exception as e:
                 logging.error(f"Error assessing startup {startup_name}: {str(e)}")
                 st.error(f"An error occurred while assessing {startup_name}. Please try again.")
@@ -125,9 +288,10 @@ def run():
         summary_data = []
         for startup in st.session_state.analyzed_startups:
             startup_name = startup['name']
-            risk_score = parse_risk_score(st.session_state.risk_assessments[startup_name])
+            risk_score = parse_risk_score(st.session_state.risk_assessments.get(startup_name, ""))
             summary_data.append({
                 "Name": startup_name,
+                "Sub-sector": startup.get('sub_sector') or st.session_state.get('selected_sub_sector'),
                 "Risk Score": risk_score if risk_score is not None else "N/A",
                 "Technology": startup.get('technology', 'N/A')
             })
@@ -137,9 +301,9 @@ def run():
       
         
         # Display overall statistics
-        valid_scores = [item['Risk Score'] for item in summary_data if item['Risk Score'] != "N/A"]
-        if valid_scores:
-            avg_risk_score = sum(valid_scores) / len(valid_scores)
+        distribution = score_distribution([item['Risk Score'] for item in summary_data])
+        if distribution:
+            avg_risk_score = distribution['mean']
             st.write(f"Average Risk Score: {avg_risk_score:.2f}")
         else:
             st.write("Average Risk Score: Unable to calculate")
@@ -147,11 +311,27 @@ def run():
 
         st.write(f"Total Startups Assessed: {len(summary_data)}")
 
+        if conn is not None:
+            render_portfolio_analytics(conn)
+
         # Generate and display GP summary and next steps
         st.subheader("Detailed Summary and Next Steps for General Partners")
-        with st.spinner("Generating insights and recommendations..."):
-            gp_summary = generate_gp_summary_and_next_steps(summary_data, avg_risk_score)
-            st.markdown(gp_summary)
+        try:
+            # Reuse the summary across reruns until the assessed startups change
+            gp_summary_key = make_cache_key("gp_summary", summary_data, avg_risk_score)
+            if st.session_state.get('gp_summary_key') != gp_summary_key:
+                if assessed_this_run:
+                    continue_in_next_run(GP_SUMMARY_DEADLINE_SECONDS)
+                with st.spinner("Generating insights and recommendations..."), deadline_scope(GP_SUMMARY_DEADLINE_SECONDS, name="gp_summary"):
+                    st.session_state.gp_summary, partial = generate_gp_summary_and_next_steps(summary_data, avg_risk_score)
+                    # Partial summaries are shown but regenerated on the next run
+                    if not partial and st.session_state.gp_summary != CLAUDE_ERROR_RESPONSE:
+                        st.session_state.gp_summary_key = gp_summary_key
+            st.markdown(st.session_state.gp_summary)
+        except DeadlineExceeded as e:
+            check_deadline()
+            logging.warning(f"GP summary timed out: {str(e)}")
+            st.error("Generating the summary took too long. Please try again.")
 
         st.success("Tech Risk Assessment completed. Review the summary and recommendations above for an overview of all assessed startups.")
 
@@ -160,6 +340,8 @@ def run():
             st.session_state.reset_tech_risk_assessor = True
             st.rerun()
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logging.error(f"Error in Tech Risk Assessor: {str(e)}")
         st.error("An error occurred in the Tech Risk Assessor stage. Please try again or contact support.")
@@ -0,0 +1,4 @@
+import os
+
+# claude_api refuses to import without a key; tests never reach the API
+os.environ.setdefault("CLAUDE_API_KEY", "test")
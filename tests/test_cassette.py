@@ -0,0 +1,70 @@
+import os
+import json
+import pytest
+from cassette import Cassette, CassetteMiss
+
+REQUEST = {"model": "test-model", "messages": [{"role": "user", "content": "hello"}]}
+
+def test_call_replays_the_recorded_response(tmp_path):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"text": "recorded"}
+
+    recorder = Cassette(directory=tmp_path, mode="record")
+    assert recorder.call("claude", REQUEST, fetch) == {"text": "recorded"}
+
+    player = Cassette(directory=tmp_path, mode="replay")
+    assert player.call("claude", REQUEST, fetch) == {"text": "recorded"}
+    assert calls == [1]
+
+def test_call_encodes_and_decodes_responses(tmp_path):
+    recorder = Cassette(directory=tmp_path, mode="record")
+    recorder.call("claude", REQUEST, lambda: ("a", "b"), encode=list, decode=tuple)
+
+    player = Cassette(directory=tmp_path, mode="replay")
+    assert player.call("claude", REQUEST, lambda: None, decode=tuple) == ("a", "b")
+
+def test_stream_replays_the_recorded_chunks(tmp_path):
+    recorder = Cassette(directory=tmp_path, mode="record")
+    assert list(recorder.stream("perplexity", REQUEST, lambda: iter(["[", "1", "]"]))) == ["[", "1", "]"]
+
+    def unexpected():
+        raise AssertionError("replay must not call the provider")
+
+    player = Cassette(directory=tmp_path, mode="replay")
+    assert list(player.stream("perplexity", REQUEST, unexpected)) == ["[", "1", "]"]
+
+def test_failed_stream_is_not_recorded(tmp_path):
+    def failing():
+        yield "["
+        raise RuntimeError("connection reset")
+
+    recorder = Cassette(directory=tmp_path, mode="record")
+    with pytest.raises(RuntimeError):
+        list(recorder.stream("perplexity", REQUEST, failing))
+
+    player = Cassette(directory=tmp_path, mode="replay")
+    with pytest.raises(CassetteMiss):
+        list(player.stream("perplexity", REQUEST, failing))
+
+def test_unrecorded_request_is_a_miss(tmp_path):
+    Cassette(directory=tmp_path, mode="record").call("claude", REQUEST, lambda: "recorded")
+
+    player = Cassette(directory=tmp_path, mode="replay")
+    with pytest.raises(CassetteMiss):
+        player.call("claude", dict(REQUEST, model="other-model"), lambda: "live")
+    with pytest.raises(CassetteMiss):
+        player.call("perplexity", REQUEST, lambda: "live")
+
+def test_recordings_are_indexed(tmp_path):
+    recorder = Cassette(directory=tmp_path, mode="record")
+    recorder.call("claude", REQUEST, lambda: "recorded")
+    list(recorder.stream("perplexity", REQUEST, lambda: iter(["chunk"])))
+
+    entries = [json.loads(line) for line in (tmp_path / "index.jsonl").read_text().splitlines()]
+    assert [entry["provider"] for entry in entries] == ["claude", "perplexity"]
+    for entry in entries:
+        assert (tmp_path / entry["path"]).exists()
+        assert entry["path"].startswith(os.path.join(entry["provider"], entry["key"][:2]))
@@ -0,0 +1,78 @@
+import logging
+from types import SimpleNamespace
+import claude_api
+from claude_api import (
+    CLAUDE_ERROR_RESPONSE, CLAUDE_MODEL_TIERS, check_prompt_cache, parse_tech_risk_response,
+    resolve_model, tech_risk_escalation_reason
+)
+from prompts import TECH_RISK_RUBRIC, get_prompt
+
+def usage(cache_write=0, cache_read=0):
+    return SimpleNamespace(input_tokens=2500, output_tokens=300,
+                           cache_creation_input_tokens=cache_write, cache_read_input_tokens=cache_read)
+
+def request_for(template, **payload):
+    system, prompt = get_prompt(template).render(**payload)
+    return {"model": "claude-3-haiku-20240307", "system": system, "messages": [{"role": "user", "content": prompt}]}
+
+def test_uncached_prefix_is_reported(caplog):
+    request = request_for("tech_risk_assessment", name="A", description="B", technology="C")
+    with caplog.at_level(logging.WARNING):
+        check_prompt_cache(request, usage())
+    assert "was not cached" in caplog.text
+
+def test_cached_prefix_is_not_reported(caplog):
+    request = request_for("tech_risk_assessment", name="A", description="B", technology="C")
+    with caplog.at_level(logging.WARNING):
+        check_prompt_cache(request, usage(cache_write=2400))
+        check_prompt_cache(request, usage(cache_read=2400))
+    assert "was not cached" not in caplog.text
+
+def test_prompts_without_cache_marker_are_not_checked(caplog):
+    request = request_for("gp_chunk_summary", sub_sector="A", num_startups=1, avg_score="5.00", chunk_json="[]")
+    with caplog.at_level(logging.WARNING):
+        check_prompt_cache(request, usage())
+    assert "was not cached" not in caplog.text
+
+def test_tech_risk_rubric_is_long_enough_to_cache():
+    # Haiku caches prefixes of at least 2048 tokens; English prose runs about 4 characters per
+    # token, so this stays a conservative lower bound without the provider's tokenizer
+    assert len(TECH_RISK_RUBRIC) >= 2048 * 4
+
+def test_resolve_model_routes_tasks_to_tiers(monkeypatch):
+    monkeypatch.setitem(claude_api.CLAUDE_MODEL_ROUTES, "custom", "claude-3-opus-20240229")
+    assert resolve_model("tech_risk_assessment") == CLAUDE_MODEL_TIERS["fast"]
+    assert resolve_model("gp_summary") == CLAUDE_MODEL_TIERS["large"]
+    assert resolve_model("unrouted_task") == resolve_model("default")
+    assert resolve_model("custom") == "claude-3-opus-20240229"
+
+ASSESSMENT = """1. Technology Novelty: High
+Explanation: New physics.
+
+2. Development Stage: Early
+Explanation: Lab prototype.
+
+Overall Risk Score: 8
+
+Summary: Risky.
+
+Confidence: {confidence}
+"""
+
+def test_parse_tech_risk_response():
+    parsed = parse_tech_risk_response(ASSESSMENT.format(confidence="High"))
+    assert parsed["Technology Novelty"] == {"risk": "High", "explanation": "New physics."}
+    assert parsed["Development Stage"]["risk"] == "Early"
+    assert parsed["Overall Risk Score"] == 8.0
+    assert parsed["Confidence"] == "High"
+
+def test_escalation_reasons():
+    def reason(response):
+        return tech_risk_escalation_reason(response, parse_tech_risk_response(response))
+
+    assert reason(ASSESSMENT.format(confidence="High")) is None
+    assert reason(ASSESSMENT.format(confidence="Medium")) is None
+    assert reason(ASSESSMENT.format(confidence="Low")) == "low_confidence"
+    assert reason(ASSESSMENT.format(confidence="[Unknown]")) == "low_confidence"
+    assert reason(ASSESSMENT.replace("Overall Risk Score: 8", "Overall Risk Score: eight").format(confidence="High")) == "unparsable"
+    assert reason(CLAUDE_ERROR_RESPONSE) == "error"
@@ -0,0 +1,53 @@
+import psycopg2
+import pytest
+from database import execute_query, parse_funding
+from deadline import DeadlineExceeded
+
+@pytest.mark.parametrize("funding, expected", [
+    ("$12.5M", 12.5e6),
+    ("$1,200,000", 1.2e6),
+    ("250k", 250e3),
+    ("$2B", 2e9),
+    (3000000, 3000000),
+    ("Undisclosed", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_funding(funding, expected):
+    assert parse_funding(funding) == expected
+
+class FakeCursor:
+    def __init__(self, error):
+        self.error = error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        raise self.error
+
+class FakeConnection:
+    def __init__(self, error):
+        self.error = error
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self.error)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def test_failed_query_rolls_back_the_connection():
+    conn = FakeConnection(psycopg2.errors.UniqueViolation("duplicate key"))
+    with pytest.raises(psycopg2.errors.UniqueViolation):
+        execute_query(conn, "INSERT INTO sectors (name) VALUES (%s)", ("Robotics",))
+    assert conn.rollbacks == 1
+
+def test_cancelled_query_rolls_back_and_raises_deadline_exceeded():
+    conn = FakeConnection(psycopg2.extensions.QueryCanceledError("canceling statement due to statement timeout"))
+    with pytest.raises(DeadlineExceeded):
+        execute_query(conn, "SELECT * FROM sectors")
+    assert conn.rollbacks == 1
@@ -0,0 +1,81 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from deadline import Deadline, DeadlineExceeded, check_deadline, deadline_scope, get_deadline, request_timeout, submit_with_context, wait_future
+
+def test_deadline_expires():
+    deadline = Deadline(0.05)
+    deadline.check()
+    time.sleep(0.1)
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+def test_child_cannot_outlive_parent():
+    parent = Deadline(1)
+    child = Deadline(60, parent=parent)
+    assert child.expires_at == parent.expires_at
+
+def test_cancelling_parent_cancels_child():
+    parent = Deadline(60)
+    child = Deadline(60, parent=parent)
+    parent.cancel()
+    assert child.is_cancelled()
+    with pytest.raises(DeadlineExceeded):
+        child.check()
+
+def test_cancelling_child_leaves_parent():
+    parent = Deadline(60)
+    child = Deadline(60, parent=parent)
+    child.cancel()
+    assert not parent.is_cancelled()
+
+def test_nested_scopes():
+    assert get_deadline() is None
+    with deadline_scope(60) as outer:
+        with deadline_scope(1) as inner:
+            assert get_deadline() is inner
+            assert inner.parent is outer
+        assert get_deadline() is outer
+    assert get_deadline() is None
+    check_deadline()
+
+def test_request_timeout_is_bounded_by_deadline():
+    assert request_timeout(30) == 30
+    with deadline_scope(1):
+        assert request_timeout(30) <= 1
+    with deadline_scope(60):
+        assert request_timeout(30) == 30
+
+def test_workers_inherit_the_deadline():
+    with ThreadPoolExecutor(max_workers=1) as executor, deadline_scope(60) as deadline:
+        assert wait_future(submit_with_context(executor, get_deadline)) is deadline
+
+def test_wait_future_honours_cancellation():
+    with ThreadPoolExecutor(max_workers=1) as executor, deadline_scope(60) as deadline:
+        future = executor.submit(time.sleep, 0.5)
+        deadline.cancel()
+        with pytest.raises(DeadlineExceeded):
+            wait_future(future)
+
+def test_cancel_if_cancels_the_deadline_and_its_children():
+    stop_requested = threading.Event()
+    parent = Deadline(60, cancel_if=stop_requested.is_set)
+    child = Deadline(60, parent=parent)
+    assert not child.is_cancelled()
+    stop_requested.set()
+    assert child.is_cancelled()
+    with pytest.raises(DeadlineExceeded):
+        parent.check()
+
+def test_wait_future_stops_once_cancel_if_fires():
+    stop_requested = threading.Event()
+    deadline = Deadline(60, cancel_if=stop_requested.is_set)
+    with ThreadPoolExecutor(max_workers=1) as executor, deadline_scope(deadline=deadline):
+        future = executor.submit(time.sleep, 1)
+        threading.Timer(0.1, stop_requested.set).start()
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            wait_future(future)
+        assert time.monotonic() - started < 0.9
@@ -0,0 +1,38 @@
+from decimal import Decimal
+import pytest
+import export
+from export import EXPORT_SCHEMA, export_assessments, infer_export_format, read_export, rows_to_record_batch
+
+ROWS = [
+    {"id": 1, "name": "Acme Robotics", "description": "Warehouse robots", "sector": "Robotics",
+     "sub_sector": "Logistics", "funding": Decimal("12500000"), "technology": "Vision",
+     "risk_score": 4.5, "comments": "Overall Risk Score: 4.5", "technology_novelty": "Medium",
+     "development_stage": "Mid", "market_potential": "High", "competition": "High",
+     "regulatory_risk": "Low", "confidence": "High"},
+    {"id": 2, "name": "Beta Bio", "sector": "Biotech", "sub_sector": "Gene Editing", "funding": None},
+]
+
+def test_rows_to_record_batch():
+    batch = rows_to_record_batch(ROWS)
+    assert batch.schema == EXPORT_SCHEMA
+    assert batch.num_rows == 2
+    columns = batch.to_pydict()
+    assert columns["funding"] == [12500000.0, None]
+    assert columns["risk_score"] == [4.5, None]
+    assert columns["description"] == ["Warehouse robots", None]
+
+@pytest.mark.parametrize("filename, export_format", [("out.parquet", "parquet"), ("out.arrow", "arrow")])
+def test_export_round_trip(tmp_path, monkeypatch, filename, export_format):
+    # Two fetchmany() batches, as the named cursor would return them
+    monkeypatch.setattr(export, "iter_startup_assessments", lambda conn, batch_size: iter([ROWS[:1], ROWS[1:]]))
+    path = str(tmp_path / filename)
+    assert infer_export_format(path) == export_format
+    assert export_assessments(None, path, export_format, batch_size=1) == 2
+    table = read_export(path)
+    assert table.schema == EXPORT_SCHEMA
+    assert table.column("name").to_pylist() == ["Acme Robotics", "Beta Bio"]
+    assert table.column("regulatory_risk").to_pylist() == ["Low", None]
+
+def test_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_assessments(None, str(tmp_path / "out.csv"), "csv")
@@ -0,0 +1,48 @@
+import stages.tech_risk_assessor as tech_risk_assessor
+from claude_api import CLAUDE_ERROR_RESPONSE
+from stages.tech_risk_assessor import chunk_summary_data, generate_gp_summary_and_next_steps, map_gp_summaries
+
+def startups(count, sub_sector="Logistics", prefix="S"):
+    return [{"Name": f"{prefix}{index}", "Sub-sector": sub_sector, "Risk Score": 5.0} for index in range(count)]
+
+def test_chunks_are_grouped_by_sub_sector():
+    chunks = chunk_summary_data(startups(3, "B") + startups(2, "A") + [{"Name": "X", "Sub-sector": None}])
+    assert [(sub_sector, len(items)) for sub_sector, items in chunks] == [("A", 2), ("B", 3), ("Unspecified", 1)]
+
+def test_large_groups_are_split_by_name_hash():
+    chunks = chunk_summary_data(startups(50), chunk_size=20)
+    assert len(chunks) == 4
+    assert sorted(item["Name"] for _, items in chunks for item in items) == sorted(f"S{index}" for index in range(50))
+
+def test_adding_a_startup_changes_only_its_bucket():
+    before = chunk_summary_data(startups(50), chunk_size=20)
+    after = chunk_summary_data(startups(50) + [{"Name": "New", "Sub-sector": "Logistics"}], chunk_size=20)
+    assert sum(old != new for old, new in zip(before, after)) == 1
+
+def test_failed_chunks_are_left_out(monkeypatch):
+    def summarize(sub_sector, items):
+        return CLAUDE_ERROR_RESPONSE if sub_sector == "B" else f"{sub_sector} summary"
+
+    monkeypatch.setattr(tech_risk_assessor, "summarize_chunk", summarize)
+    data_section, failed = map_gp_summaries(startups(2, "A") + startups(3, "B"))
+    assert "A summary" in data_section
+    assert CLAUDE_ERROR_RESPONSE not in data_section
+    assert "B (3 startups)" in data_section and "partial" in data_section
+    assert failed == [("B", 3)]
+
+def test_partial_summary_is_marked(monkeypatch):
+    monkeypatch.setattr(tech_risk_assessor, "GP_SUMMARY_CHUNK_SIZE", 2)
+    monkeypatch.setattr(tech_risk_assessor, "summarize_chunk",
+                        lambda sub_sector, items: CLAUDE_ERROR_RESPONSE if sub_sector == "B" else "ok")
+    monkeypatch.setattr(tech_risk_assessor, "generate_claude_response", lambda prompt, **kwargs: "Final summary")
+    summary, partial = generate_gp_summary_and_next_steps(startups(2, "A") + startups(1, "B"), 5.0)
+    assert partial
+    assert summary.startswith("**Partial summary:** 1 of 3 startups")
+    assert summary.endswith("Final summary")
+
+def test_all_chunks_failing_skips_the_final_call(monkeypatch):
+    monkeypatch.setattr(tech_risk_assessor, "GP_SUMMARY_CHUNK_SIZE", 2)
+    monkeypatch.setattr(tech_risk_assessor, "summarize_chunk", lambda sub_sector, items: CLAUDE_ERROR_RESPONSE)
+    monkeypatch.setattr(tech_risk_assessor, "generate_claude_response",
+                        lambda prompt, **kwargs: (_ for _ in ()).throw(AssertionError("not expected")))
+    assert generate_gp_summary_and_next_steps(startups(3), 5.0) == (CLAUDE_ERROR_RESPONSE, True)
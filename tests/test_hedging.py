@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+import threading
+import time
+import pytest
+import claude_api
+import hedging
+from deadline import DeadlineExceeded, deadline_scope, get_deadline
+from hedging import HedgeBudget, LatencyTracker
+
+def test_budget_caps_hedges_at_percentage_of_calls():
+    budget = HedgeBudget(percent=10)
+    for _ in range(20):
+        budget.record_call()
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+def test_budget_without_calls():
+    assert not HedgeBudget(percent=5).try_acquire()
+
+def test_latency_percentile_needs_min_samples():
+    tracker = LatencyTracker()
+    for seconds in range(5):
+        tracker.record("key", seconds)
+    assert tracker.percentile("key", min_samples=10) is None
+
+def test_latency_percentile():
+    tracker = LatencyTracker()
+    for seconds in range(1, 101):
+        tracker.record("key", float(seconds))
+    assert tracker.percentile("key", percentile=95) == 95.0
+
+def test_latency_window():
+    tracker = LatencyTracker(window=10)
+    for seconds in range(100):
+        tracker.record("key", float(seconds))
+    assert tracker.percentile("key", percentile=0, min_samples=10) == 90.0
+
+def test_losing_leg_deadline_is_cancelled(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(hedging, "hedge_budget", HedgeBudget(percent=100))
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        hedging.latency_tracker.record("key", 0.05)
+    primary_deadlines = []
+    primary_stopped = threading.Event()
+
+    def primary():
+        deadline = get_deadline()
+        primary_deadlines.append(deadline)
+        while not deadline.expired():
+            time.sleep(0.01)
+        primary_stopped.set()
+        return "primary"
+
+    assert hedging.hedged_call("key", primary, lambda: "hedge") == "hedge"
+    assert primary_stopped.wait(timeout=5)
+    assert primary_deadlines[0].is_cancelled()
+
+def test_cancelling_the_caller_cancels_both_legs(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(hedging, "hedge_budget", HedgeBudget(percent=100))
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        hedging.latency_tracker.record("key", 0.05)
+    leg_deadlines = []
+
+    def slow():
+        leg_deadlines.append(get_deadline())
+        time.sleep(1)
+        return "late"
+
+    with deadline_scope(0.2):
+        with pytest.raises(DeadlineExceeded):
+            hedging.hedged_call("key", slow)
+    assert len(leg_deadlines) == 2
+    assert all(deadline.expired() for deadline in leg_deadlines)
+
+def test_only_primary_latency_is_recorded(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(hedging, "hedge_budget", HedgeBudget(percent=100))
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        hedging.latency_tracker.record("key", 0.05)
+    primary_done = threading.Event()
+
+    def primary():
+        time.sleep(0.3)
+        primary_done.set()
+        return "primary"
+
+    assert hedging.hedged_call("key", primary, lambda: "hedge") == "hedge"
+    assert primary_done.wait(timeout=5)
+    time.sleep(0.05)
+    samples = list(hedging.latency_tracker.samples["key"])
+    assert len(samples) == hedging.HEDGE_MIN_SAMPLES + 1
+    assert samples[-1] >= 0.3
+
+def test_calls_without_enough_samples_run_inline(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging, "latency_tracker", LatencyTracker())
+    caller = threading.current_thread()
+    assert hedging.hedged_call("key", lambda: threading.current_thread()) is caller
+    assert len(hedging.latency_tracker.samples["key"]) == 1
+
+def test_escalation_hedges_on_the_large_model(monkeypatch):
+    calls = []
+
+    def generate(prompt, **kwargs):
+        calls.append(kwargs)
+        confidence = "Low" if kwargs["model"] == claude_api.CLAUDE_MODEL_TIERS["fast"] else "High"
+        return f"Overall Risk Score: 5\nConfidence: {confidence}"
+
+    monkeypatch.setattr(claude_api, "generate_claude_response_with_retry", generate)
+    claude_api.assess_tech_risk('{"name": "A"}')
+    assert len(calls) == 2
+    assert calls[1]["model"] == calls[1]["hedge_model"] == claude_api.CLAUDE_MODEL_TIERS["large"]
+
+def test_hedge_request_uses_hedge_model(monkeypatch):
+    models = []
+    monkeypatch.setattr(claude_api, "hedged_call", lambda key, primary, hedge: hedge())
+    monkeypatch.setattr(claude_api, "CLAUDE_HEDGE_FALLBACK_MODEL", "fallback-model")
+    monkeypatch.setattr(claude_api, "create_claude_message",
+                        lambda request: models.append(request["model"]) or SimpleNamespace(content=[SimpleNamespace(text="ok")]))
+    claude_api.generate_claude_response("prompt", model="large-model", hedge=True)
+    claude_api.generate_claude_response("prompt", model="large-model", hedge=True, hedge_model="large-model")
+    assert models == ["fallback-model", "large-model"]
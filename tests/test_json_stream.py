@@ -0,0 +1,47 @@
+from json_stream import JsonArrayObjectParser, parse_json_array_objects
+
+def test_parses_objects_from_surrounding_text():
+    content = 'Here are the startups:\n[{"name": "A"}, {"name": "B"}]\nLet me know if you need more.'
+    assert parse_json_array_objects(content) == [{"name": "A"}, {"name": "B"}]
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = JsonArrayObjectParser()
+    assert parser.feed('[{"name": "A", "tech') == []
+    assert parser.feed('nology": "x"}, {"na') == [{"name": "A", "technology": "x"}]
+    assert parser.feed('me": "B"}]') == [{"name": "B"}]
+    assert parser.finished
+
+def test_braces_and_quotes_inside_strings():
+    content = '[{"name": "A", "description": "uses {curly} and [square] brackets, \\"quotes\\" too"}]'
+    assert parse_json_array_objects(content) == [
+        {"name": "A", "description": 'uses {curly} and [square] brackets, "quotes" too'}
+    ]
+
+def test_nested_objects_and_arrays():
+    content = '[{"name": "A", "investors": [{"name": "X"}], "tags": ["ai", "ml"]}]'
+    assert parse_json_array_objects(content) == [
+        {"name": "A", "investors": [{"name": "X"}], "tags": ["ai", "ml"]}
+    ]
+
+def test_malformed_object_is_skipped():
+    parser = JsonArrayObjectParser()
+    objects = parser.feed('[{"name": "A"}, {"name": "B",}, {"name": "C"}]')
+    assert objects == [{"name": "A"}, {"name": "C"}]
+    assert parser.errors == 1
+
+def test_citations_before_the_array_are_ignored():
+    content = 'According to recent reports [1][2], these companies stand out:\n[{"name": "A"}]'
+    assert parse_json_array_objects(content) == [{"name": "A"}]
+
+def test_truncated_stream_keeps_completed_objects():
+    parser = JsonArrayObjectParser()
+    assert parser.feed('[{"name": "A"}, {"name": "B", "descr') == [{"name": "A"}]
+    assert not parser.finished
+
+def test_input_after_the_array_is_ignored():
+    parser = JsonArrayObjectParser()
+    assert parser.feed('[{"name": "A"}] and [{"name": "B"}]') == [{"name": "A"}]
+    assert parser.feed('{"name": "C"}') == []
+
+def test_no_array():
+    assert parse_json_array_objects("No startups found.") == []
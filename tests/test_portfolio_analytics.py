@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+import portfolio_analytics
+from portfolio_analytics import (
+    RISK_DIMENSIONS, compute_portfolio_analytics, dimension_breakdown, dimension_by_sector,
+    load_portfolio_frame, normalize_risk_level, score_distribution, sector_risk_matrix
+)
+
+COLUMNS = ["id", "sector", "sub_sector", "risk_score", "technology_novelty", "development_stage",
+           "market_potential", "competition", "regulatory_risk", "confidence"]
+
+def portfolio_frame(monkeypatch, rows):
+    monkeypatch.setattr(portfolio_analytics, "get_portfolio_assessments", lambda conn: (COLUMNS, rows))
+    return load_portfolio_frame(None)
+
+@pytest.mark.parametrize("value, expected", [
+    ("Medium", "Medium"),
+    ("[High]", "High"),
+    ("low", "Low"),
+    ("Medium (see note", "Medium"),
+    ("Early-stage", "Early"),
+    ("Moderate", "Unknown"),
+    ("", "Unknown"),
+    (None, "Unknown"),
+])
+def test_normalize_risk_level(value, expected):
+    assert normalize_risk_level(value) == expected
+
+def test_score_distribution():
+    distribution = score_distribution([2, 4, 6, 8, "N/A", None])
+    assert distribution["count"] == 4
+    assert distribution["mean"] == 5.0
+    assert distribution["percentiles"][50] == 5.0
+    assert distribution["histogram"]["Startups"].sum() == 4
+
+def test_score_distribution_without_scores():
+    assert score_distribution(["N/A"]) is None
+
+def test_raw_dimension_text_is_counted(monkeypatch):
+    rows = [
+        (i, "Robotics", "Logistics", 5.0, "High", "Early", "High", "Medium", "Medium (see note", "High")
+        for i in range(30000)
+    ]
+    breakdown = dimension_breakdown(portfolio_frame(monkeypatch, rows))
+    assert breakdown.loc["Regulatory Risk", "Medium"] == 30000
+    assert breakdown.loc["Technology Novelty", "High"] == 30000
+
+def test_breakdown_keeps_values_outside_the_known_levels():
+    df = pd.DataFrame({column: ["Low", "Odd"] for column in RISK_DIMENSIONS})
+    breakdown = dimension_breakdown(df)
+    assert list(breakdown.columns) == ["Low", "Odd"]
+    assert breakdown["Odd"].sum() == len(RISK_DIMENSIONS)
+
+def test_sector_views(monkeypatch):
+    rows = [
+        (1, "Robotics", "Logistics", 4.0, "Low", "Late", "High", "High", "Low", "High"),
+        (2, "Robotics", "Logistics", 6.0, "High", "Early", "Medium", "Low", None, "Low"),
+        (3, "Biotech", None, 8.0, None, "Mid", "High", "Low", "High", "Medium"),
+    ]
+    df = portfolio_frame(monkeypatch, rows)
+    matrix = sector_risk_matrix(df)
+    assert matrix.loc["Robotics", "Logistics"] == 5.0
+    assert matrix.loc["Biotech", "Unknown"] == 8.0
+    shares = dimension_by_sector(df, "technology_novelty")
+    assert shares.loc["Robotics", "Low"] == 0.5
+    analytics = compute_portfolio_analytics(df)
+    assert analytics["distribution"]["count"] == 3
+    assert analytics["sub_sector_summary"].iloc[0]["mean"] == 8.0
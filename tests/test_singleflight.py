@@ -0,0 +1,146 @@
+import threading
+import time
+import pytest
+from deadline import DeadlineExceeded, deadline_scope
+from singleflight import SingleFlight
+
+def run_in_threads(count, target):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight("test")
+    calls = []
+    results = {}
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    run_in_threads(5, lambda index: results.__setitem__(index, single_flight.do("key", fetch)))
+    assert len(calls) == 1
+    assert list(results.values()) == ["result"] * 5
+    assert single_flight.calls == {}
+
+def test_different_keys_are_not_coalesced():
+    single_flight = SingleFlight("test")
+    assert single_flight.do("a", lambda: 1) == 1
+    assert single_flight.do("b", lambda: 2) == 2
+
+def test_leader_exception_is_shared():
+    single_flight = SingleFlight("test")
+    errors = []
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    def call(index):
+        try:
+            single_flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    run_in_threads(3, call)
+    assert len(errors) == 3
+
+def test_follower_retries_when_leader_deadline_is_cancelled():
+    single_flight = SingleFlight("test")
+    calls = []
+    leader_started = threading.Event()
+    results = []
+
+    def fetch():
+        calls.append(1)
+        leader_started.set()
+        with deadline_scope(5) as deadline:
+            if len(calls) == 1:
+                # The leader's session goes away while its request is in flight
+                deadline.cancel()
+                time.sleep(0.1)
+                deadline.check()
+        return "result"
+
+    def follower():
+        leader_started.wait(timeout=5)
+        with deadline_scope(5):
+            results.append(single_flight.do("key", fetch))
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(DeadlineExceeded):
+        single_flight.do("key", fetch)
+    thread.join(timeout=5)
+    assert results == ["result"]
+    assert len(calls) == 2
+
+def test_follower_stops_waiting_at_its_own_deadline():
+    single_flight = SingleFlight("test")
+    leader_started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        leader_started.set()
+        release.wait(timeout=5)
+        return "result"
+
+    thread = threading.Thread(target=lambda: single_flight.do("key", slow))
+    thread.start()
+    leader_started.wait(timeout=5)
+    try:
+        with pytest.raises(DeadlineExceeded), deadline_scope(0.1):
+            single_flight.do("key", slow)
+    finally:
+        release.set()
+        thread.join(timeout=5)
+
+def test_concurrent_streams_share_one_upstream():
+    single_flight = SingleFlight("test")
+    calls = []
+    results = {}
+
+    def upstream():
+        calls.append(1)
+        for index in range(5):
+            time.sleep(0.05)
+            yield str(index)
+
+    run_in_threads(3, lambda index: results.__setitem__(index, "".join(single_flight.stream("key", upstream))))
+    assert len(calls) == 1
+    assert list(results.values()) == ["01234"] * 3
+    assert single_flight.streams == {}
+
+def test_stream_stops_once_every_subscriber_leaves():
+    single_flight = SingleFlight("test")
+    closed = threading.Event()
+
+    def upstream():
+        try:
+            for index in range(1000):
+                time.sleep(0.01)
+                yield str(index)
+        finally:
+            closed.set()
+
+    chunks = single_flight.stream("key", upstream)
+    assert next(chunks) == "0"
+    chunks.close()
+    assert closed.wait(timeout=5)
+    assert single_flight.streams == {}
+
+def test_stream_error_reaches_subscribers():
+    single_flight = SingleFlight("test")
+
+    def upstream():
+        yield "a"
+        raise ValueError("boom")
+
+    received = []
+    with pytest.raises(ValueError):
+        for chunk in single_flight.stream("key", upstream):
+            received.append(chunk)
+    assert received == ["a"]
@@ -0,0 +1,16 @@
+from perplexity_api import merge_startups, normalize_startup_name
+
+def test_normalize_startup_name():
+    assert normalize_startup_name("Acme Robotics, Inc.") == "acmeroboticsinc"
+    assert normalize_startup_name(None) == ""
+
+def test_merge_skips_duplicates_by_normalized_name():
+    existing = [{"name": "Acme Robotics"}]
+    added = merge_startups(existing, [{"name": "ACME robotics"}, {"name": "Beta Bio"}, {"name": "Beta-Bio"}])
+    assert added == [{"name": "Beta Bio"}]
+    assert [startup["name"] for startup in existing] == ["Acme Robotics", "Beta Bio"]
+
+def test_merge_skips_unnamed_startups():
+    existing = []
+    assert merge_startups(existing, [{"description": "no name"}, {"name": ""}]) == []
+    assert existing == []
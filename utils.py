@@ -1,7 +1,55 @@
+import functools
+import logging
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from deadline import Deadline, DeadlineExceeded, deadline_scope, get_deadline, ACTION_DEADLINE_SECONDS
 
 def initialize_session_state():
     if "current_stage" not in st.session_state:
         st.session_state.current_stage = "Sector Selector"
     if "progress" not in st.session_state:
         st.session_state.progress = 0.25
+
+def script_stop_check():
+    # Streamlit only acts on a stop or rerun request at the script's next st.* call, so a run
+    # blocked on provider calls or worker threads would finish work nobody will see. Returns a
+    # check, for Deadline(cancel_if=...), that reports whether the current run has been superseded.
+    ctx = get_script_run_ctx()
+    requests = getattr(ctx, "script_requests", None)
+    if requests is None:
+        return None
+
+    def stop_requested():
+        state = getattr(getattr(requests, "_state", None), "name", None)
+        if state == "STOP":
+            return True
+        if state != "RERUN":
+            return False
+        # Widget-triggered fragment reruns queue behind the current run instead of preempting it
+        rerun_data = getattr(requests, "_rerun_data", None)
+        return not (getattr(rerun_data, "fragment_id_queue", None)
+                    and not getattr(rerun_data, "is_fragment_scoped_rerun", False))
+    return stop_requested
+
+def action_fragment(func):
+    # st.fragment whose partial reruns get their own action deadline, since they run
+    # without going through main()
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        deadline = Deadline(ACTION_DEADLINE_SECONDS, name=func.__name__, parent=get_deadline(),
+                            cancel_if=script_stop_check())
+        try:
+            with deadline_scope(deadline=deadline):
+                return func(*args, **kwargs)
+        except DeadlineExceeded as e:
+            logging.warning(f"{func.__name__} stopped: {str(e)}")
+            st.warning("This step took too long and was stopped. Please try again.")
+        finally:
+            deadline.cancel()
+    return st.fragment(wrapper)
+
+def request_stage_transition(next_stage):
+    # Picked up by main() before the navigation radio is rendered
+    st.session_state.transition_to_next_stage = True
+    st.session_state.next_stage = next_stage
+    st.rerun()